@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -19,13 +21,26 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.0/howto/deployment/checklist/
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'cf@7ogw8fv_(=ve8yk^=7i%y(u!t6$s793=zkhykh7(79r@!0c'
-
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also keeps every executed SQL query in memory
+DEBUG = os.environ.get('DJANGO_DEBUG', '0') == '1'
 
-ALLOWED_HOSTS = []
+# SECURITY WARNING: keep the secret key used in production secret!
+# It signs sessions and keys the login credential cache, so the key of the
+# repository is only used for development, with DEBUG on
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured(
+            'DJANGO_SECRET_KEY must be set when DJANGO_DEBUG is off'
+        )
+    SECRET_KEY = 'cf@7ogw8fv_(=ve8yk^=7i%y(u!t6$s793=zkhykh7(79r@!0c'
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
 
 
 # Application definition
@@ -37,6 +52,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -45,6 +61,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.AdmissionControlMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,21 +93,93 @@ TEMPLATES = [
 WSGI_APPLICATION = 'app.wsgi.application'
 
 
+# Request threads of every server process, GUNICORN_THREADS of the gunicorn
+# gthread workers, whose pool queues the connections it accepted out of
+# sight of the middleware
+SERVER_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Uploaded recipe images are resized by this many background threads per
+# process; 0 processes them during the upload request
+IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2))
+
+
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        "ENGINE": "django.db.backends.postgresql",
+        # core.db.pooled_postgresql keeps a bounded pool of connections per
+        # process, configured by POOL (see core.db.pooled_postgresql.base)
+        "ENGINE": os.environ.get(
+            'DB_ENGINE',
+            'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
-        "PORT": os.environ.get("DB_PORT")
+        "PORT": os.environ.get("DB_PORT"),
+        # seconds a connection is kept open for the next requests of the
+        # same worker thread, 0 closes it after every request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # the request threads and the image workers of a process share its
+        # pool, which holds a connection for each of them by default
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get(
+                'DB_POOL_MAX_SIZE', SERVER_THREADS + IMAGE_PROCESSING_WORKERS
+            )),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
+# Passwords are hashed with the preferred hasher, PASSWORD_HASHER, and
+# rehashed with it when users log in; the others still verify old hashes.
+# argon2 needs argon2-cffi and bcrypt needs bcrypt to be installed
+_password_hashers = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+_preferred_hasher = _password_hashers.pop(
+    os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+)
+PASSWORD_HASHERS = [
+    _preferred_hasher,
+    *_password_hashers.values(),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Passwords verified at login are remembered in-process as keyed digests
+# for LOGIN_CREDENTIAL_CACHE_TTL seconds, skipping the hasher on repeats
+AUTHENTICATION_BACKENDS = ['core.authentication.CachedCredentialsBackend']
+LOGIN_CREDENTIAL_CACHE_SIZE = 1024
+LOGIN_CREDENTIAL_CACHE_TTL = 300
+
+# Token requests are rejected before hashing once a client address or an
+# email failed to log in too often within LOGIN_FAILURE_WINDOW seconds
+LOGIN_FAILURE_CACHE = 'default'
+LOGIN_FAILURE_WINDOW = 900
+LOGIN_FAILURE_LIMIT_PER_IP = int(os.environ.get('LOGIN_FAILURE_LIMIT_PER_IP', 50))
+LOGIN_FAILURE_LIMIT_PER_EMAIL = int(
+    os.environ.get('LOGIN_FAILURE_LIMIT_PER_EMAIL', 10)
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -132,10 +222,96 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Media transfers are handed to the front proxy with this header, either
+# X-Accel-Redirect (nginx, internal location MEDIA_INTERNAL_URL aliased to
+# MEDIA_ROOT) or X-Sendfile; left empty, Django streams the files itself
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER', '')
+MEDIA_INTERNAL_URL = '/internal-media/'
+
+# Uploaded files are stored once per distinct content, see core.storage
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Uploads are streamed to a temporary file instead of being held in memory
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Additional settings
 
 AUTH_USER_MODEL = "core.User"
 
+# Token lookups are cached in-process for TOKEN_AUTH_LOCAL_CACHE_TTL seconds
+# and in the TOKEN_AUTH_CACHE cache for TOKEN_AUTH_CACHE_TIMEOUT seconds
+TOKEN_AUTH_CACHE = 'default'
+TOKEN_AUTH_CACHE_TIMEOUT = 300
+TOKEN_AUTH_LOCAL_CACHE_SIZE = 1024
+TOKEN_AUTH_LOCAL_CACHE_TTL = 30
+
+# Recipe list/detail responses are cached per user in RESPONSE_CACHE_ALIAS
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_WAIT_TIMEOUT = 2
+
+# Recipe lists read tag and ingredient ids from the denormalized summary
+# column instead of the relation tables; see rebuild_recipe_summaries
+RECIPE_LIST_READ_MODEL = os.environ.get('RECIPE_LIST_READ_MODEL', '1') == '1'
+
+# Tag and ingredient autocomplete indexes kept in memory by every process,
+# capped in total keys; users with more items are served by the database
+AUTOCOMPLETE_MAX_KEYS = int(os.environ.get('AUTOCOMPLETE_MAX_KEYS', 500000))
+AUTOCOMPLETE_MAX_USER_ITEMS = int(
+    os.environ.get('AUTOCOMPLETE_MAX_USER_ITEMS', 20000)
+)
+
+# Recipe exports are streamed in keyset batches of this many recipes
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+# and imported in transactions of this many recipes
+RECIPE_IMPORT_CHUNK_SIZE = 1000
+
+# Requests are measured per view and action by RequestMetricsMiddleware and
+# exposed on /metrics to scrapers sending this bearer token; every process
+# keeps its own metrics. Slow requests are logged with repeated queries.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', 500))
+METRICS_SLOW_REQUEST_QUERIES = int(
+    os.environ.get('METRICS_SLOW_REQUEST_QUERIES', 50)
+)
+
+# Recipe, tag and ingredient endpoints are throttled with a token bucket
+# per user and endpoint, sized by DEFAULT_THROTTLE_RATES and drained by the
+# throttle_costs of the actions; buckets are kept in THROTTLE_CACHE, which
+# must be a shared cache for the limits to hold across processes
+THROTTLE_CACHE = 'default'
+
+# Client addresses, used by the throttles and the login failure limits,
+# are taken from X-Forwarded-For only as appended by the NUM_PROXIES
+# reverse proxies in front of the app; with none the header is ignored
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "recipe.pagination.KeysetPagination",
+    "PAGE_SIZE": 100,
+    "NUM_PROXIES": int(os.environ.get('NUM_PROXIES', 0)),
+    "DEFAULT_THROTTLE_CLASSES": ["core.throttling.TokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "recipe": os.environ.get('THROTTLE_RATE_RECIPE', '1200/min'),
+        "tag": os.environ.get('THROTTLE_RATE_TAG', '600/min'),
+        "ingredient": os.environ.get('THROTTLE_RATE_INGREDIENT', '600/min'),
+    },
+}
+
+# API requests served at once by every process. Further requests wait up to
+# ADMISSION_QUEUE_TIMEOUT seconds in a queue of ADMISSION_MAX_QUEUE and
+# beyond it are answered 503 at once. Both must leave threads free below
+# SERVER_THREADS: those threads take the requests queued by the server and
+# reject them at once while the slots are busy, which is what sheds load.
+# 0 turns the limit off
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get(
+    'ADMISSION_MAX_CONCURRENCY', max(1, SERVER_THREADS - 1)
+))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 0))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2))
+ADMISSION_RETRY_AFTER = 1
+
 # import sentry_sdk
 # from sentry_sdk.integrations.django import DjangoIntegration
 #
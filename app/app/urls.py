@@ -15,13 +15,21 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import metrics_view
+from recipe.views import RecipeMediaView
+
 
 urlpatterns = [
     # path('sentry-debug/', trigger_error),
     path('admin/', admin.site.urls),
     path("api/user/", include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path("metrics", metrics_view, name="metrics"),
+    path(
+        settings.MEDIA_URL.lstrip("/") + "<path:name>",
+        RecipeMediaView.as_view(),
+        name="media"
+    ),
+]
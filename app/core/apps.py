@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import checks, signals  # noqa: F401
+        from core.db.pooled_postgresql.base import pool_metrics
+        from core.metrics import registry
+        registry.register(pool_metrics)
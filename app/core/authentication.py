@@ -0,0 +1,192 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTTLCache:
+    """Thread safe in-process LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored under key, or None if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_token_cache = LocalTTLCache(
+    maxsize=getattr(settings, "TOKEN_AUTH_LOCAL_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "TOKEN_AUTH_LOCAL_CACHE_TTL", 30)
+)
+
+
+def shared_token_cache():
+    """Return the cache shared by every process for token lookups"""
+    return caches[getattr(settings, "TOKEN_AUTH_CACHE", "default")]
+
+
+def token_cache_key(key):
+    """Return the cache key of a token without storing the token itself"""
+    return "auth-token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """Drop a token from both cache tiers"""
+    cache_key = token_cache_key(key)
+    local_token_cache.delete(cache_key)
+    shared_token_cache().delete(cache_key)
+
+
+def dump_instance(instance, exclude=()):
+    """Return the concrete field values of a model instance as plain data"""
+    return {
+        field.attname: field.value_from_object(instance)
+        for field in instance._meta.concrete_fields
+        if field.attname not in exclude
+    }
+
+
+def load_instance(model, data):
+    """Return an instance of model from dump_instance data
+
+    Fields missing from the data are deferred, loaded from the database
+    when accessed.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.attname in data
+    ]
+    return model.from_db(
+        router.db_for_read(model),
+        [field.attname for field in fields],
+        [field.to_python(data[field.attname]) for field in fields]
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token and its user
+
+    Lookups go through an in-process LRU, then through the shared cache,
+    and only fall back to the Token + User query on a miss in both. The
+    token and the fields of its user but the password are cached as JSON
+    and rebuilt into new instances for every request, the password being
+    deferred. Deleting a token or saving its user invalidates both tiers
+    of the current process; other processes drop their local entries once
+    TOKEN_AUTH_LOCAL_CACHE_TTL runs out.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        data = local_token_cache.get(cache_key)
+        if data is None:
+            shared_cache = shared_token_cache()
+            data = shared_cache.get(cache_key)
+            if data is None:
+                user, token = super().authenticate_credentials(key)
+                data = json.dumps({
+                    "token": dump_instance(token),
+                    "user": dump_instance(user, exclude=("password",)),
+                }, cls=DjangoJSONEncoder)
+                shared_cache.set(
+                    cache_key,
+                    data,
+                    getattr(settings, "TOKEN_AUTH_CACHE_TIMEOUT", 300)
+                )
+            local_token_cache.set(cache_key, data)
+
+        data = json.loads(data)
+        token = load_instance(Token, data["token"])
+        token.user = load_instance(get_user_model(), data["user"])
+        return (token.user, token)
+
+
+credential_cache = LocalTTLCache(
+    maxsize=getattr(settings, "LOGIN_CREDENTIAL_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "LOGIN_CREDENTIAL_CACHE_TTL", 300)
+)
+
+
+def credential_key(user, password):
+    """Return a keyed digest of a password checked against a user's hash
+
+    The stored hash is part of the digest, so changing the password or
+    upgrading its hash invalidates the entry.
+    """
+    message = "\0".join((str(user.pk), user.password, password))
+    return hmac.new(
+        settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+class CachedCredentialsBackend(ModelBackend):
+    """Model backend remembering recently verified passwords
+
+    A password that matched a user's hash is remembered in-process for
+    LOGIN_CREDENTIAL_CACHE_TTL seconds as a keyed digest, so repeated
+    logins skip the slow password hasher. The token of the user is
+    fetched with it.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related(
+                "auth_token"
+            ).get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # hash anyway, so that unknown emails take as long as others
+            UserModel().set_password(password)
+            return None
+
+        if credential_cache.get(credential_key(user, password)) is None:
+            # may rehash the password with the preferred hasher
+            if not user.check_password(password):
+                return None
+            credential_cache.set(credential_key(user, password), True)
+        if self.user_can_authenticate(user):
+            return user
+        return None
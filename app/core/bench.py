@@ -0,0 +1,286 @@
+import http.client
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from core.metrics import RequestMetrics
+from core.models import CollectionVersion, Tag, Ingredient, Recipe
+
+# vocabulary of the synthetic titles and ingredient names
+WORDS = (
+    "apple", "basil", "bean", "beef", "bread", "broccoli", "butter",
+    "cabbage", "carrot", "cheese", "chicken", "chili", "chocolate", "cod",
+    "cream", "curry", "egg", "garlic", "ginger", "honey", "lamb", "leek",
+    "lemon", "lentil", "mango", "mushroom", "noodle", "oat", "onion",
+    "orange", "pasta", "pea", "pepper", "pork", "potato", "pumpkin",
+    "rice", "salmon", "spinach", "tofu", "tomato", "tuna", "walnut",
+)
+DISHES = (
+    "bake", "burger", "cake", "casserole", "curry", "pie", "risotto",
+    "salad", "sandwich", "soup", "stew", "stir fry", "tart", "wrap",
+)
+
+
+def seed_catalogue(user, recipes, tags=50, ingredients=200, fanout=3,
+                   batch_size=5000, rng=None):
+    """Bulk create a synthetic catalogue of recipes for a user
+
+    Tags and ingredients are created up to the requested count, then
+    recipes are inserted in batches, each linked to `fanout` random tags
+    and ingredients through bulk inserts on the through tables, and
+    indexed for search.
+    """
+    rng = rng or random.Random(0)
+    tag_ids = _seed_items(Tag, user, "tag", tags, batch_size)
+    ingredient_ids = _seed_items(
+        Ingredient, user, "ingredient", ingredients, batch_size,
+        words=WORDS
+    )
+    recipe_tags = Recipe.tags.through
+    recipe_ingredients = Recipe.ingredients.through
+
+    created = 0
+    while created < recipes:
+        size = min(batch_size, recipes - created)
+        with transaction.atomic():
+            batch = Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=_title(rng, created + i),
+                    time_minutes=rng.randint(1, 240),
+                    price=rng.randint(100, 99999) / 100,
+                )
+                for i in range(size)
+            ])
+            recipe_tags.objects.bulk_create([
+                recipe_tags(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in batch
+                for tag_id in _sample(rng, tag_ids, fanout)
+            ], batch_size=batch_size)
+            recipe_ingredients.objects.bulk_create([
+                recipe_ingredients(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id
+                )
+                for recipe in batch
+                for ingredient_id in _sample(rng, ingredient_ids, fanout)
+            ], batch_size=batch_size)
+            Recipe.objects.filter(pk__in=[recipe.id for recipe in batch]) \
+                .update_related()
+        created += size
+    return created
+
+
+def seed_users(count, recipes, password, prefix="bench",
+               domain="ryszyydev.com", batch_size=5000, **catalogue):
+    """Bulk create `count` users with tokens and synthetic catalogues
+
+    Users are named <prefix><n>@<domain> and share one password hash.
+    Catalogues of existing users are topped up to `recipes` recipes, the
+    other keyword arguments being passed to seed_catalogue.
+    """
+    User = get_user_model()
+    emails = [f"{prefix}{i}@{domain}" for i in range(count)]
+    hashed = make_password(password)
+    User.objects.bulk_create(
+        [User(email=email, password=hashed) for email in emails],
+        batch_size=batch_size,
+        ignore_conflicts=True
+    )
+    users = list(User.objects.filter(email__in=emails).order_by("id"))
+    tokens = [Token(user=user) for user in users]
+    for token in tokens:
+        token.key = token.generate_key()
+    Token.objects.bulk_create(
+        tokens, batch_size=batch_size, ignore_conflicts=True
+    )
+
+    created = 0
+    for index, user in enumerate(users):
+        missing = recipes - Recipe.objects.filter(user=user).count()
+        if missing > 0:
+            created += seed_catalogue(
+                user, missing, batch_size=batch_size,
+                rng=random.Random(index), **catalogue
+            )
+            CollectionVersion.objects.bump(
+                user.pk, Recipe._meta.model_name, Tag._meta.model_name,
+                Ingredient._meta.model_name
+            )
+    return users, created
+
+
+def _title(rng, number):
+    """Return a synthetic recipe title"""
+    return " ".join((
+        rng.choice(WORDS), rng.choice(WORDS), rng.choice(DISHES), str(number)
+    ))
+
+
+def _seed_items(model, user, prefix, count, batch_size, words=None):
+    """Create missing named items for a user and return all of their ids"""
+    if words:
+        names = [f"{words[i % len(words)]} {i}" for i in range(count)]
+    else:
+        names = [f"{prefix}-{i}" for i in range(count)]
+    model.objects.bulk_create(
+        [model(user=user, name=name) for name in names],
+        batch_size=batch_size,
+        ignore_conflicts=True
+    )
+    return list(
+        model.objects.filter(user=user).values_list("id", flat=True)
+    )
+
+
+def _sample(rng, population, size):
+    """Return up to `size` distinct random items from the population"""
+    return rng.sample(population, min(size, len(population)))
+
+
+def measure(func, repeat):
+    """Call func `repeat` times and return latency percentiles in ms"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def unthrottled():
+    """Return settings turning the API throttles off in this process
+
+    Benchmarks send far more requests than a user is allowed to, so a
+    server loaded over HTTP needs raised THROTTLE_RATE_* as well.
+    """
+    rates = settings.REST_FRAMEWORK.get("DEFAULT_THROTTLE_RATES", {})
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {scope: None for scope in rates},
+    })
+
+
+class ClientTransport:
+    """Send API requests through the Django test client
+
+    Returns (status, content, queries) for every request, counting the
+    queries run on the default connection.
+    """
+
+    def __init__(self, headers=None):
+        self.client = Client()
+        self.headers = headers or {}
+
+    def send(self, method, path, body=b"", content_type=None):
+        request_metrics = RequestMetrics()
+        with connection.execute_wrapper(request_metrics):
+            response = self.client.generic(
+                method, path, body, content_type or "",
+                **{"HTTP_" + name.upper().replace("-", "_"): value
+                   for name, value in self.headers.items()}
+            )
+        return response.status_code, response.content, request_metrics.queries
+
+
+class HTTPTransport:
+    """Send API requests to a running server, one connection per thread
+
+    Query counts are unknown over HTTP and returned as None.
+    """
+
+    def __init__(self, url, headers=None):
+        self.url = urlsplit(url)
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    def send(self, method, path, body=b"", content_type=None):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._local.connection = http.client.HTTPConnection(
+                self.url.hostname, self.url.port
+            )
+        headers = dict(self.headers)
+        if content_type:
+            headers["Content-Type"] = content_type
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read(), None
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            return None, b"", None
+
+
+def run_load(send, requests, concurrency=1):
+    """Call send() `requests` times from `concurrency` threads
+
+    send returns whether the call succeeded; without concurrency it is
+    called from the current thread. Returns the latency summary
+    of the successful calls with the number of failures and the
+    throughput in calls per second.
+    """
+    remaining = [requests]
+    lock = threading.Lock()
+    timings = []
+    errors = []
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            ok = send()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                (timings if ok else errors).append(elapsed)
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        # in the calling thread, sharing its database connection
+        worker()
+    else:
+        threads = [
+            threading.Thread(target=worker) for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    duration = time.perf_counter() - start
+    return {
+        **summarize(timings),
+        "errors": len(errors),
+        "duration": duration,
+        "throughput": len(timings) / duration if duration else 0.0,
+    }
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = int(round(fraction * len(values)))
+    return values[min(len(values) - 1, max(0, rank - 1))]
+
+
+def summarize(timings):
+    """Return count and p50/p95/p99/max of a list of timings"""
+    timings = sorted(timings)
+    return {
+        "count": len(timings),
+        "p50": percentile(timings, 0.50),
+        "p95": percentile(timings, 0.95),
+        "p99": percentile(timings, 0.99),
+        "max": timings[-1] if timings else 0.0,
+    }
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def check_admission_control(app_configs, **kwargs):
+    """Warn when admission control leaves no thread to reject requests"""
+    limit = getattr(settings, "ADMISSION_MAX_CONCURRENCY", 3)
+    queue = getattr(settings, "ADMISSION_MAX_QUEUE", 0)
+    threads = getattr(settings, "SERVER_THREADS", 4)
+    if not limit or threads <= 1 or limit + queue < threads:
+        return []
+    return [Warning(
+        f"ADMISSION_MAX_CONCURRENCY + ADMISSION_MAX_QUEUE ({limit + queue}) "
+        f"is not below SERVER_THREADS ({threads}).",
+        hint="Requests then queue in the server, where they are never "
+             "rejected; lower the limit or the queue.",
+        id="core.W001",
+    )]
+
+
+# caches holding limits that only hold when every process sees them
+SHARED_CACHE_SETTINGS = ("THROTTLE_CACHE", "LOGIN_FAILURE_CACHE")
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Warn when request limits are kept in a cache of every process"""
+    if settings.DEBUG:
+        return []
+    messages = []
+    for name in SHARED_CACHE_SETTINGS:
+        alias = getattr(settings, name, "default")
+        backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+        if backend.endswith(".locmem.LocMemCache"):
+            messages.append(Warning(
+                f"{name} uses the local memory cache {alias!r}.",
+                hint="Every server process then keeps its own limits; set "
+                     "CACHE_BACKEND and CACHE_LOCATION to a shared cache "
+                     "such as memcached.",
+                id="core.W002",
+            ))
+    return messages
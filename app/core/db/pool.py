@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection of the pool became free in time"""
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections of one process
+
+    At most `max_size` connections are open at once; a checkout waits up
+    to `timeout` seconds for one to be returned. Idle connections are
+    health checked on checkout: closed ones and ones older than
+    `max_lifetime` are dropped, and ones idle for more than
+    `check_interval` seconds must answer ``SELECT 1`` first. Connections
+    returned in the middle of a transaction are rolled back.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10, check_interval=30,
+                 max_lifetime=1800):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        # idle entries of (connection, opened at, returned at)
+        self._idle = deque()
+        self._opened = {}
+        self._condition = threading.Condition()
+        self._counters = {
+            "opened": 0, "reused": 0, "discarded": 0, "checks": 0,
+            "waits": 0, "timeouts": 0,
+        }
+
+    def checkout(self):
+        """Return a healthy connection, opening one if the pool allows"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry, token = self._take(deadline)
+            if entry is None:
+                break
+            connection, opened_at, returned_at = entry
+            if self._healthy(connection, opened_at, returned_at):
+                with self._condition:
+                    self._counters["reused"] += 1
+                return connection
+            self._discard(connection)
+
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                del self._opened[id(token)]
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opened[id(connection)] = self._opened.pop(id(token))
+            self._counters["opened"] += 1
+        return connection
+
+    def _take(self, deadline):
+        """Return (idle entry, None) or (None, token reserving a slot)
+
+        Waits until `deadline` for either.
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop(), None
+                if len(self._opened) < self.max_size:
+                    # reserve the slot while connecting outside of the lock
+                    token = object()
+                    self._opened[id(token)] = time.monotonic()
+                    return None, token
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        "connection pool exhausted: %d connections in "
+                        "use" % len(self._opened)
+                    )
+                self._counters["waits"] += 1
+                self._condition.wait(remaining)
+
+    def checkin(self, connection):
+        """Give a connection back to the pool"""
+        if id(connection) not in self._opened:
+            connection.close()
+            return
+        if not connection.closed and connection.get_transaction_status() \
+                != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                pass
+        if connection.closed or connection.get_transaction_status() \
+                != extensions.TRANSACTION_STATUS_IDLE:
+            self._discard(connection)
+            return
+        with self._condition:
+            opened_at = self._opened[id(connection)]
+            self._idle.append((connection, opened_at, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        """Close the idle connections; ones in use are closed on checkin"""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            for connection, _, _ in idle:
+                self._opened.pop(id(connection), None)
+            self._condition.notify_all()
+        for connection, _, _ in idle:
+            connection.close()
+
+    def stats(self):
+        """Return the size of the pool and its counters"""
+        with self._condition:
+            return {
+                "size": len(self._opened),
+                "idle": len(self._idle),
+                "in_use": len(self._opened) - len(self._idle),
+                "max_size": self.max_size,
+                **self._counters,
+            }
+
+    def _healthy(self, connection, opened_at, returned_at):
+        now = time.monotonic()
+        if connection.closed or now - opened_at > self.max_lifetime:
+            return False
+        if now - returned_at < self.check_interval:
+            return True
+        with self._condition:
+            self._counters["checks"] += 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, connection):
+        with self._condition:
+            self._opened.pop(id(connection), None)
+            self._counters["discarded"] += 1
+            self._condition.notify()
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+
+def get_pool(key, factory):
+    """Return the pool of this process registered under key
+
+    Pools inherited from a parent process are dropped after a fork, as
+    their sockets belong to the parent.
+    """
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = factory()
+        return pool
+
+
+def all_pools():
+    """Return the pools of this process by key"""
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            return {}
+        return dict(_pools)
@@ -0,0 +1,100 @@
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import ConnectionPool, all_pools, get_pool
+
+POOL_DEFAULTS = {
+    "MAX_SIZE": 10,
+    "TIMEOUT": 10,
+    "CHECK_INTERVAL": 30,
+    "MAX_LIFETIME": 1800,
+}
+
+
+def pool_stats():
+    """Return the metrics of every pool of this process by alias"""
+    stats = {}
+    for (alias, _), pool in all_pools().items():
+        stats[alias] = pool.stats()
+    return stats
+
+
+POOL_GAUGES = ("size", "idle", "in_use", "max_size")
+
+
+def pool_metrics():
+    """Return the pool stats as (name, type, labels, value) samples"""
+    samples = []
+    for alias, stats in sorted(pool_stats().items()):
+        for key, value in sorted(stats.items()):
+            if key in POOL_GAUGES:
+                samples.append(
+                    (f"db_pool_{key}", "gauge", {"alias": alias}, value)
+                )
+            else:
+                samples.append(
+                    (f"db_pool_{key}_total", "counter", {"alias": alias},
+                     value)
+                )
+    return samples
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # idle pooled connections would keep the test database in use
+        for (alias, params), pool in all_pools().items():
+            if dict(params).get("database") == test_database_name:
+                pool.close()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend drawing its connections from a per-process pool
+
+    Closing a connection, as Django does at the end of requests when
+    CONN_MAX_AGE is 0, returns it to the pool. The pool is configured by
+    the POOL dict of the database settings, see POOL_DEFAULTS. Server side
+    cursors are disabled by default so that the backend can run behind
+    PgBouncer in transaction pooling mode; psycopg2 never uses prepared
+    statements.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        settings_dict.setdefault("DISABLE_SERVER_SIDE_CURSORS", True)
+        super().__init__(settings_dict, *args, **kwargs)
+
+    @property
+    def pool(self):
+        params = self.get_connection_params()
+        key = (self.alias, tuple(sorted(params.items())))
+        options = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+        return get_pool(key, lambda: ConnectionPool(
+            lambda: base.Database.connect(**params),
+            max_size=options["MAX_SIZE"],
+            timeout=options["TIMEOUT"],
+            check_interval=options["CHECK_INTERVAL"],
+            max_lifetime=options["MAX_LIFETIME"],
+        ))
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # short lived connections used to create and drop databases
+            return super().get_new_connection(conn_params)
+        connection = self.pool.checkout()
+        options = self.settings_dict["OPTIONS"]
+        try:
+            self.isolation_level = options["isolation_level"]
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.alias == NO_DB_ALIAS:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.checkin(self.connection)
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 
+from core.models import Recipe
+
 
 def create_user(**params):
     defaults = {
@@ -10,6 +12,13 @@ def create_user(**params):
     return get_user_model().objects.create_user(**defaults)
 
 
+def sample_recipe(user, title="Sample recipe", **params):
+    """Create and return a recipe of user"""
+    defaults = {"time_minutes": 10, "price": 5}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, title=title, **defaults)
+
+
 def create_superuser(**params):
     return get_user_model().objects.create_superuser(**params)
 
@@ -0,0 +1,235 @@
+import io
+import json
+import random
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.bench import ClientTransport, HTTPTransport, run_load, unthrottled
+from core.models import CollectionVersion, Tag, Ingredient, Recipe
+
+RECIPES_PATH = "/api/recipe/recipes/"
+TOKEN_PATH = "/api/user/token/"
+SCENARIOS = ("list", "detail", "filter", "create", "upload-image", "token")
+
+
+class Command(BaseCommand):
+    """Benchmark the API endpoints on a seeded user"""
+    help = "Drive the list, detail, filter, create, upload-image and token " \
+           "endpoints of a user created by seed_bench, report throughput, " \
+           "latency percentiles and queries per request, and compare them " \
+           "with a stored baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Server to load over HTTP, e.g. http://localhost:8000, "
+                 "with raised THROTTLE_RATE_*; requests go through the "
+                 "test client, unthrottled, when omitted"
+        )
+        parser.add_argument("--email", default="bench0@ryszyydev.com")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            help="Scenario to run, may be repeated; defaults to all"
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Concurrent connections, over HTTP only"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--baseline", help="JSON results to compare with")
+        parser.add_argument("--save", help="Write the results as JSON")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="Fail when a p95 latency grows by more than this percent "
+                 "or queries per request grow over the baseline"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f"No user with email {options['email']}, run seed_bench"
+            )
+        token, _ = Token.objects.get_or_create(user=self.user)
+        headers = {"Authorization": f"Token {token.key}"}
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.rng_lock = threading.Lock()
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=self.user)
+            .order_by("-id").values_list("id", flat=True)[:1000]
+        )
+        self.tag_ids = self._ids(Tag)
+        self.ingredient_ids = self._ids(Ingredient)
+        if not self.recipe_ids:
+            raise CommandError(f"{options['email']} has no recipes")
+        self.created = []
+        self.image_recipe = Recipe.objects.create(
+            user=self.user, title="Benchmark upload", time_minutes=1, price=1
+        )
+        self.image_body = encode_multipart(
+            BOUNDARY, {"image": self._image()}
+        )
+
+        if options["url"]:
+            transport = HTTPTransport(options["url"], headers)
+            concurrency = options["concurrency"]
+            hosts = settings.ALLOWED_HOSTS
+        else:
+            transport = ClientTransport(headers)
+            concurrency = 1
+            hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts), unthrottled():
+                for name in options["scenario"] or SCENARIOS:
+                    results[name] = self._run(name, transport, concurrency)
+        finally:
+            self._cleanup()
+
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        if options["baseline"]:
+            self._compare(results)
+
+    def _run(self, name, transport, concurrency):
+        request = getattr(self, "_" + name.replace("-", "_"))
+        queries = []
+
+        def send():
+            method, path, body, content_type, expected = request()
+            status, content, count = transport.send(
+                method, path, body, content_type
+            )
+            if count is not None:
+                queries.append(count)
+            if name == "create" and status == expected:
+                self.created.append(json.loads(content)["id"])
+            return status == expected
+
+        stats = run_load(send, self.options["requests"], concurrency)
+        stats["queries"] = sum(queries) / len(queries) if queries else None
+        self.stdout.write(
+            "{name:<13} {count} ok {errors} failed {throughput:8.1f} req/s "
+            "p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms "
+            "queries={queries}".format(
+                name=name, **{
+                    **stats, "queries": "n/a" if stats["queries"] is None
+                    else f"{stats['queries']:.1f}"
+                }
+            )
+        )
+        return stats
+
+    def _list(self):
+        return "GET", RECIPES_PATH, b"", None, 200
+
+    def _detail(self):
+        recipe_id = self._choice(self.recipe_ids)
+        return "GET", f"{RECIPES_PATH}{recipe_id}/", b"", None, 200
+
+    def _filter(self):
+        tags = ",".join(map(str, self._sample(self.tag_ids, 2)))
+        ingredients = self._choice(self.ingredient_ids)
+        path = f"{RECIPES_PATH}?tags={tags}&ingredients={ingredients}"
+        return "GET", path, b"", None, 200
+
+    def _create(self):
+        body = json.dumps({
+            "title": "Benchmark recipe",
+            "time_minutes": 10,
+            "price": "5.00",
+            "tags": self._sample(self.tag_ids, 2),
+            "ingredients": self._sample(self.ingredient_ids, 3),
+        }).encode()
+        return "POST", RECIPES_PATH, body, "application/json", 201
+
+    def _upload_image(self):
+        path = f"{RECIPES_PATH}{self.image_recipe.id}/upload-image/"
+        return "POST", path, self.image_body, MULTIPART_CONTENT, 202
+
+    def _token(self):
+        body = json.dumps({
+            "email": self.options["email"],
+            "password": self.options["password"],
+        }).encode()
+        return "POST", TOKEN_PATH, body, "application/json", 200
+
+    def _compare(self, results):
+        with open(self.options["baseline"]) as f:
+            baseline = json.load(f)
+        limit = self.options["max_regression"]
+        regressions = []
+        for name, stats in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            p95 = _change(before["p95"], stats["p95"])
+            throughput = _change(before["throughput"], stats["throughput"])
+            queries = None
+            if stats["queries"] is not None \
+                    and before.get("queries") is not None:
+                queries = stats["queries"] - before["queries"]
+            self.stdout.write(
+                f"{name:<13} p95 {p95:+.1f}% throughput {throughput:+.1f}% "
+                + ("" if queries is None else f"queries {queries:+.1f}")
+            )
+            if limit is not None and (p95 > limit or (queries or 0) > 0.05):
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"Regressions against {self.options['baseline']}: "
+                + ", ".join(regressions)
+            )
+
+    def _cleanup(self):
+        """Delete the recipes created by the benchmark"""
+        Recipe.objects.filter(
+            pk__in=self.created + [self.image_recipe.pk]
+        ).delete()
+        CollectionVersion.objects.bump(
+            self.user.pk, Recipe._meta.model_name
+        )
+
+    def _ids(self, model):
+        return list(
+            model.objects.filter(user=self.user).values_list("id", flat=True)
+        )
+
+    def _choice(self, population):
+        with self.rng_lock:
+            return self.rng.choice(population)
+
+    def _sample(self, population, size):
+        with self.rng_lock:
+            return self.rng.sample(population, min(size, len(population)))
+
+    def _image(self):
+        """Return an in-memory JPEG upload"""
+        image = io.BytesIO()
+        Image.new("RGB", (800, 600), (200, 120, 40)).save(image, "JPEG")
+        image.seek(0)
+        image.name = "bench.jpg"
+        return image
+
+
+def _change(before, after):
+    """Return the change from before to after in percent"""
+    return (after - before) / before * 100 if before else 0.0
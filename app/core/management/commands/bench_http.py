@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from core.bench import HTTPTransport, run_load
+
+
+class Command(BaseCommand):
+    """Load test a running server over HTTP"""
+    help = "Measure throughput and latency of an API endpoint under load, " \
+           "e.g. to compare runserver with the gunicorn profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000")
+        parser.add_argument("--path", default="/api/recipe/recipes/")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--email", default="bench@ryszyydev.com")
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            email=options["email"]
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        transport = HTTPTransport(
+            options["url"], {"Authorization": f"Token {token.key}"}
+        )
+
+        def send():
+            return transport.send("GET", options["path"])[0] == 200
+
+        stats = run_load(send, options["requests"], options["concurrency"])
+        self.stdout.write(
+            f"{options['url']}{options['path']}: " +
+            "{count} ok, {errors} failed in {duration:.1f}s, "
+            "{throughput:.1f} req/s".format(**stats)
+        )
+        self.stdout.write(
+            "  latency ms p50={p50:.1f} p95={p95:.1f} p99={p99:.1f} "
+            "max={max:.1f}".format(**stats)
+        )
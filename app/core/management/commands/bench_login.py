@@ -0,0 +1,113 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from core.authentication import credential_cache
+from core.bench import ClientTransport, run_load, unthrottled
+from user.views import login_failure_counters
+
+TOKEN_PATH = "/api/user/token/"
+HASHERS = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+}
+
+
+class Command(BaseCommand):
+    """Benchmark the token endpoint in logins per second on one core"""
+    help = "Time logins that hash the password, logins served from the " \
+           "credential cache and logins rejected by the failure limits, " \
+           "for every installed password hasher"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument(
+            "--hasher",
+            action="append",
+            choices=sorted(HASHERS),
+            help="Hasher to measure, may be repeated; defaults to all"
+        )
+        parser.add_argument("--email", default="bench-login@ryszyydev.com")
+        parser.add_argument("--password", default="bench-password")
+
+    def handle(self, *args, **options):
+        self.options = options
+        User = get_user_model()
+        if User.objects.filter(email=options["email"]).exists():
+            raise CommandError(
+                f"{options['email']} exists, the benchmark deletes its user"
+            )
+        self.user = User.objects.create_user(email=options["email"])
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts), unthrottled():
+                for name in options["hasher"] or sorted(HASHERS):
+                    self._bench(name)
+        finally:
+            self.user.delete()
+
+    def _bench(self, name):
+        hashers = [HASHERS[name], *settings.PASSWORD_HASHERS]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            hasher = get_hasher()
+            try:
+                if hasher.library is not None:
+                    hasher._load_library()
+            except ValueError:
+                self.stdout.write(f"{name:<7} not installed")
+                return
+            self.user.set_password(self.options["password"])
+            self.user.save()
+            self._reset()
+            transport = ClientTransport()
+            body = json.dumps({
+                "email": self.options["email"],
+                "password": self.options["password"],
+            }).encode()
+            wrong = json.dumps({
+                "email": self.options["email"], "password": "wrong"
+            }).encode()
+
+            def login(payload, expected, clear=False):
+                def send():
+                    if clear:
+                        credential_cache.clear()
+                    status = transport.send(
+                        "POST", TOKEN_PATH, payload, "application/json"
+                    )[0]
+                    return status == expected
+                return send
+
+            scenarios = [("hashed", login(body, 200, clear=True)),
+                         ("cached", login(body, 200))]
+            for scenario, send in scenarios:
+                self._report(name, scenario, run_load(
+                    send, self.options["requests"]
+                ))
+            with override_settings(LOGIN_FAILURE_LIMIT_PER_EMAIL=1):
+                transport.send("POST", TOKEN_PATH, wrong, "application/json")
+                self._report(name, "rejected", run_load(
+                    login(body, 429), self.options["requests"]
+                ))
+            self._reset()
+
+    def _report(self, hasher, scenario, stats):
+        self.stdout.write(
+            f"{hasher:<7} {scenario:<9} " +
+            "{throughput:8.1f} logins/s p50={p50:.1f}ms p95={p95:.1f}ms "
+            "errors={errors}".format(**stats)
+        )
+
+    def _reset(self):
+        """Forget the remembered credentials and the recorded failures"""
+        credential_cache.clear()
+        request = RequestFactory().post(TOKEN_PATH)
+        for counter, key in login_failure_counters(
+            request, self.options["email"]
+        ):
+            counter.reset(key)
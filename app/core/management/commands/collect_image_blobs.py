@@ -0,0 +1,83 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ImageBlob, recipe_image_file_path
+
+
+class Command(BaseCommand):
+    """Delete stored recipe images that no recipe references anymore"""
+    help = "Garbage collect unreferenced blobs of the recipe image storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=3600,
+            help="Keep files written or reused within this many seconds, "
+                 "as their references may not be committed yet"
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        root = os.path.dirname(recipe_image_file_path(None, "blob.jpg"))
+        cutoff = timezone.now() - timedelta(seconds=options["grace"])
+        referenced = set(
+            ImageBlob.objects.filter(references__gt=0)
+            .values_list("name", flat=True)
+        )
+
+        deleted = freed = 0
+        for name in self._walk(root):
+            if name in referenced:
+                continue
+            path = default_storage.path(name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff.timestamp():
+                continue
+            if not options["dry_run"] and \
+                    not self._release(name, path, cutoff):
+                continue
+            deleted += 1
+            freed += stat.st_size
+
+        if not options["dry_run"]:
+            # rows of blobs that were never written or are already gone
+            ImageBlob.objects.filter(
+                references__lte=0,
+                created_at__lt=cutoff
+            ).delete()
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            f"{verb} {deleted} unreferenced files ({freed} bytes)"
+        )
+
+    def _walk(self, root):
+        """Yield the names of every file stored under root"""
+        top = default_storage.path(root)
+        for directory, _, files in os.walk(top):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                yield os.path.join(root, os.path.relpath(path, top))
+
+    def _release(self, name, path, cutoff):
+        """Delete a blob unless it got used since the scan started"""
+        with transaction.atomic():
+            blob = ImageBlob.objects.select_for_update() \
+                .filter(name=name).first()
+            if blob is not None and blob.references > 0:
+                return False
+            # an upload of the same content refreshes the file
+            if os.stat(path).st_mtime > cutoff.timestamp():
+                return False
+            default_storage.delete(name)
+            if blob is not None:
+                blob.delete()
+        return True
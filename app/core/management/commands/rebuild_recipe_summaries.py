@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Max, Min
+
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Rebuild and verify the denormalized summaries of recipes"""
+    help = "Recompute Recipe.summary from the tag and ingredient tables in " \
+           "id ranges, then compare every summary with those tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only verify the summaries, failing if any is stale"
+        )
+        parser.add_argument("--email", help="Limit to a user's recipes")
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options["email"]:
+            recipes = recipes.filter(user__email=options["email"])
+        bounds = recipes.aggregate(low=Min("id"), high=Max("id"))
+        if bounds["low"] is None:
+            self.stdout.write("No recipes")
+            return
+
+        if not options["check"]:
+            start = time.perf_counter()
+            updated = 0
+            for batch in self._batches(recipes, bounds, options):
+                updated += batch.update_summary()
+            self.stdout.write(
+                f"Rebuilt {updated} summaries in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+
+        stale = []
+        for batch in self._batches(recipes, bounds, options):
+            stale += batch.annotate(expected=batch.summary_expression()) \
+                .exclude(summary=F("expected")) \
+                .values_list("id", flat=True)
+        if stale:
+            raise CommandError(
+                f"{len(stale)} summaries differ from the relation tables, "
+                f"e.g. recipes {stale[:10]}"
+            )
+        self.stdout.write(self.style.SUCCESS("Summaries are consistent"))
+
+    def _batches(self, recipes, bounds, options):
+        """Yield querysets of consecutive id ranges of the recipes"""
+        size = options["batch_size"]
+        for low in range(bounds["low"], bounds["high"] + 1, size):
+            yield recipes.filter(id__gte=low, id__lt=low + size)
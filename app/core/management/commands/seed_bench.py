@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bench import seed_users
+
+
+class Command(BaseCommand):
+    """Seed benchmark users with synthetic recipe catalogues"""
+    help = "Bulk create users <prefix><n>@ryszyydev.com with tokens, tags, " \
+           "ingredients and recipes for bench_api and the other benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument(
+            "--recipes", type=int, default=1000, help="Recipes per user"
+        )
+        parser.add_argument("--tags", type=int, default=50)
+        parser.add_argument("--ingredients", type=int, default=200)
+        parser.add_argument(
+            "--fanout",
+            type=int,
+            default=3,
+            help="Tags and ingredients linked to every recipe"
+        )
+        parser.add_argument("--prefix", default="bench")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        users, created = seed_users(
+            options["users"],
+            options["recipes"],
+            options["password"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+            tags=options["tags"],
+            ingredients=options["ingredients"],
+            fanout=options["fanout"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users with {created} new recipes in "
+            f"{time.perf_counter() - start:.1f}s"
+        ))
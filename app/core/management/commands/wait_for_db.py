@@ -1,20 +1,89 @@
+import random
 import time
 
 from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
-    """Django command to pause execution until database is available"""
+    """Django command to pause execution until database is available
 
-    def handle(self, *args, **kwargs):
-        # self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
+    The database is probed with a real connection and a ``SELECT 1``.
+    Failed probes are retried after exponentially growing delays with full
+    jitter, so that containers starting together do not retry in lockstep,
+    until the --timeout deadline. With --migrations the command also waits
+    until every migration has been applied.
+    """
+    help = "Wait until the database accepts queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Give up after this many seconds"
+        )
+        parser.add_argument("--initial-delay", type=float, default=0.1)
+        parser.add_argument("--max-delay", type=float, default=5)
+        parser.add_argument(
+            "--migrations",
+            action="store_true",
+            help="Also wait until all migrations are applied"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        start = time.monotonic()
+        deadline = start + options["timeout"]
+        attempts = 0
+        self.stdout.write("Waiting for database...")
+        while True:
+            attempts += 1
             try:
-                db_conn = connections["default"]
-            except OperationalError:
-                # self.stdout.write("Database unavailable, waiting 1 second")
-                time.sleep(1)
-        # self.stdout.write(self.style.SUCCESS("Database is available"))
+                self.probe(connection, options["migrations"])
+                break
+            except OperationalError as exc:
+                reason = str(exc).strip() or exc.__class__.__name__
+                # drop a connection broken by the failed query
+                if connection.errors_occurred:
+                    connection.close()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(
+                    f"Database unavailable after {attempts} attempts in "
+                    f"{time.monotonic() - start:.2f}s: {reason}"
+                )
+            backoff = min(
+                options["max_delay"],
+                options["initial_delay"] * 2 ** (attempts - 1)
+            )
+            delay = min(random.uniform(0, backoff), remaining)
+            self.stdout.write(
+                f"Database unavailable ({reason}), "
+                f"retrying in {delay:.2f}s"
+            )
+            time.sleep(delay)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Database available after {time.monotonic() - start:.2f}s "
+            f"({attempts} attempts)"
+        ))
+
+    def probe(self, connection, migrations=False):
+        """Raise OperationalError unless the database answers queries"""
+        # cursor() opens the connection through ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        if migrations:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(
+                executor.loader.graph.leaf_nodes()
+            )
+            if plan:
+                raise OperationalError(
+                    f"{len(plan)} migrations are not applied"
+                )
@@ -0,0 +1,204 @@
+import bisect
+import re
+import threading
+import time
+from collections import Counter
+
+# upper bounds of the histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(9))
+
+_whitespace = re.compile(r"\s+")
+_placeholder_lists = re.compile(r"\((?:%s, )*%s\)")
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Return sql with its literals and placeholder lists collapsed
+
+    Queries built from the same code path share a fingerprint whatever
+    their parameters, so repeated fingerprints in a request point to N+1
+    lookups.
+    """
+    sql = _whitespace.sub(" ", sql.strip())
+    sql = _literals.sub("?", sql)
+    return _placeholder_lists.sub("(...)", sql)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """Yield (le, cumulative count) for every bucket and +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """In-process histograms and counters rendered in Prometheus format
+
+    Metrics are keyed by name and a tuple of label pairs. Collectors are
+    callables returning (name, type, labels, value) samples of gauges or
+    counters kept elsewhere, read on every scrape. Every process has its
+    own registry, so a scrape reports the process that served it.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register(self, collector):
+        """Add a collector of samples read on every scrape"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def histogram(self, name, **labels):
+        """Return (count, sum) of a histogram, for tests and benchmarks"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                return 0, 0
+            return histogram.count, histogram.sum
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """Return the text exposition of every metric"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(histogram.samples()), histogram.sum,
+                 histogram.count)
+                for key, histogram in self._histograms.items()
+            )
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), samples, total, count in histograms:
+            declare(name, "histogram")
+            for bound, cumulative in samples:
+                bucket_labels = format_labels(labels + (("le", bound),))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        for collector in self._collectors:
+            for name, kind, labels, value in collector():
+                declare(name, kind)
+                lines.append(
+                    f"{name}{format_labels(tuple(labels.items()))} {value}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    ) + "}"
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Database and serialization work done while serving one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self.fingerprints = Counter()
+        self._serializing = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper counting and timing the queries"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit=5):
+        """Return the most repeated (fingerprint, count) of the request"""
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+_local = threading.local()
+
+
+def current():
+    """Return the metrics of the request served by this thread, if any"""
+    return getattr(_local, "metrics", None)
+
+
+def activate(metrics):
+    _local.metrics = metrics
+
+
+class TimedSerializerMixin:
+    """Add the time spent representing instances to the request metrics
+
+    Only the outermost serializer is timed, nested ones being part of it.
+    """
+
+    def to_representation(self, instance):
+        metrics = current()
+        if metrics is None or metrics._serializing:
+            return super().to_representation(instance)
+        metrics._serializing += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics._serializing -= 1
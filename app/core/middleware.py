@@ -0,0 +1,186 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.translation import gettext as _
+
+from core import metrics
+from core.ratelimit import ConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def view_labels(view_func, method):
+    """Return the (view, action) labels of a resolved view function
+
+    Viewsets are labelled by their action, other views by the method.
+    """
+    view = getattr(view_func, "cls", None) or view_func
+    actions = getattr(view_func, "actions", None) or {}
+    return view.__name__, actions.get(method.lower(), method.lower())
+
+
+class RequestMetricsMiddleware:
+    """Record the database, serialization and rendering work of requests
+
+    Queries of every connection are counted and timed with an execute
+    wrapper. The numbers are observed in the histograms of the metrics
+    registry per view and action, and requests slower than
+    METRICS_SLOW_REQUEST_MS or running more than
+    METRICS_SLOW_REQUEST_QUERIES queries are logged with their most
+    repeated query fingerprints.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        request.metrics_labels = ("unresolved", request.method.lower())
+        metrics.activate(request_metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.activate(None)
+        duration = time.perf_counter() - start
+        self.record(request, response, request_metrics, duration)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_labels = view_labels(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        request_metrics = metrics.current()
+        start = time.perf_counter()
+
+        def rendered(response):
+            request_metrics.render_time += time.perf_counter() - start
+
+        if request_metrics is not None:
+            response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, request_metrics, duration):
+        view, action = request.metrics_labels
+        labels = {"view": view, "action": action}
+        size = None if response.streaming else len(response.content)
+        registry = metrics.registry
+        registry.increment(
+            "http_requests_total", {**labels, "status": response.status_code}
+        )
+        registry.observe("http_request_duration_seconds", labels, duration)
+        registry.observe(
+            "http_request_queries", labels, request_metrics.queries,
+            metrics.QUERY_BUCKETS
+        )
+        registry.observe(
+            "http_request_db_seconds", labels, request_metrics.db_time
+        )
+        registry.observe(
+            "http_request_serializer_seconds", labels,
+            request_metrics.serializer_time
+        )
+        registry.observe(
+            "http_request_render_seconds", labels,
+            request_metrics.render_time
+        )
+        if size is not None:
+            registry.observe(
+                "http_response_size_bytes", labels, size,
+                metrics.SIZE_BUCKETS
+            )
+
+        slow_ms = getattr(settings, "METRICS_SLOW_REQUEST_MS", 500)
+        slow_queries = getattr(settings, "METRICS_SLOW_REQUEST_QUERIES", 50)
+        if duration * 1000 >= slow_ms \
+                or request_metrics.queries > slow_queries:
+            logger.warning(
+                "Slow request %s %s (%s.%s): %.0f ms, %d queries in "
+                "%.0f ms, serializer %.0f ms, render %.0f ms, %s bytes%s",
+                request.method, request.path, view, action,
+                duration * 1000, request_metrics.queries,
+                request_metrics.db_time * 1000,
+                request_metrics.serializer_time * 1000,
+                request_metrics.render_time * 1000,
+                "streamed" if size is None else size,
+                "".join(
+                    f"\n  {count}x {sql}"
+                    for sql, count in request_metrics.duplicates()
+                )
+            )
+
+
+class AdmissionControlMiddleware:
+    """Shed API requests beyond the concurrency this process can serve
+
+    At most ADMISSION_MAX_CONCURRENCY API requests are served at once;
+    the others queue for a slot for ADMISSION_QUEUE_TIMEOUT seconds.
+    Requests finding ADMISSION_MAX_QUEUE requests queued, or still queued
+    at the timeout, are answered 503 with Retry-After. Streaming responses
+    keep their slot until they are closed.
+
+    Requests beyond the threads of the server wait in its own queue, which
+    the middleware cannot see; the limit and the queue are kept below
+    SERVER_THREADS so that the remaining threads drain that queue with
+    503s while the slots are busy.
+    """
+    path_prefix = "/api/"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        limit = getattr(settings, "ADMISSION_MAX_CONCURRENCY", 3)
+        self.limiter = ConcurrencyLimiter(
+            limit,
+            getattr(settings, "ADMISSION_MAX_QUEUE", 0),
+            getattr(settings, "ADMISSION_QUEUE_TIMEOUT", 2)
+        ) if limit else None
+
+    def __call__(self, request):
+        if self.limiter is None \
+                or not request.path.startswith(self.path_prefix):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        if not self.limiter.acquire():
+            metrics.registry.increment("admission_rejected_total", {})
+            response = JsonResponse(
+                {"detail": _("Server busy, please retry later.")},
+                status=503
+            )
+            response["Retry-After"] = str(
+                getattr(settings, "ADMISSION_RETRY_AFTER", 1)
+            )
+            return response
+        metrics.registry.observe(
+            "admission_wait_seconds", {}, time.perf_counter() - start
+        )
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.limiter.release()
+            raise
+        if response.streaming:
+            response._closable_objects.append(SlotRelease(self.limiter))
+        else:
+            self.limiter.release()
+        return response
+
+
+class SlotRelease:
+    """Release a slot of a limiter when the response is closed"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def close(self):
+        self.limiter.release()
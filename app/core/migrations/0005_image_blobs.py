@@ -0,0 +1,51 @@
+# Generated by Django 3.0.3 on 2026-10-17 06:51
+
+import core.models
+from collections import Counter
+
+from django.db import migrations, models
+
+IMAGE_FIELDS = ("image", "image_thumbnail", "image_medium", "image_webp")
+
+
+def count_image_references(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    ImageBlob = apps.get_model("core", "ImageBlob")
+    counts = Counter(
+        name
+        for names in Recipe.objects.values_list(*IMAGE_FIELDS).iterator()
+        for name in names
+        if name
+    )
+    ImageBlob.objects.bulk_create([
+        ImageBlob(name=name, references=count)
+        for name, count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(
+            count_image_references,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 3.0.3 on 2026-10-17 06:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    """Index search_text for typo matching where pg_trgm is available"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX core_recipe_search_text_trgm_idx ON core_recipe "
+        "USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute("DROP INDEX IF EXISTS core_recipe_search_text_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunSQL(
+            sql="""
+                WITH names AS (
+                    SELECT r.id,
+                           (SELECT string_agg(i.name, ' ')
+                              FROM core_recipe_ingredients ri
+                              JOIN core_ingredient i ON i.id = ri.ingredient_id
+                             WHERE ri.recipe_id = r.id) AS ingredients,
+                           (SELECT string_agg(t.name, ' ')
+                              FROM core_recipe_tags rt
+                              JOIN core_tag t ON t.id = rt.tag_id
+                             WHERE rt.recipe_id = r.id) AS tags
+                      FROM core_recipe r
+                )
+                UPDATE core_recipe r
+                   SET search_vector =
+                           setweight(to_tsvector('english', r.title), 'A')
+                           || setweight(to_tsvector('english', coalesce(names.ingredients, '')), 'B')
+                           || setweight(to_tsvector('english', coalesce(names.tags, '')), 'C'),
+                       search_text = r.title || ' '
+                           || coalesce(names.ingredients, '') || ' '
+                           || coalesce(names.tags, '')
+                  FROM names
+                 WHERE names.id = r.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
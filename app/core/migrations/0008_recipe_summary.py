@@ -0,0 +1,46 @@
+# Generated by Django 3.0.3 on 2026-10-17 07:50
+
+import core.models
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_item_name_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='summary',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=core.models.empty_recipe_summary, editable=False),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE core_recipe
+                   SET summary = jsonb_build_object(
+                       'tags', COALESCE((
+                           SELECT jsonb_agg(
+                                      jsonb_build_object('id', t.id, 'name', t.name)
+                                      ORDER BY t.id
+                                  )
+                             FROM core_recipe_tags rt
+                             JOIN core_tag t ON t.id = rt.tag_id
+                            WHERE rt.recipe_id = core_recipe.id
+                       ), '[]'::jsonb),
+                       'ingredients', COALESCE((
+                           SELECT jsonb_agg(
+                                      jsonb_build_object('id', i.id, 'name', i.name)
+                                      ORDER BY i.id
+                                  )
+                             FROM core_recipe_ingredients ri
+                             JOIN core_ingredient i ON i.id = ri.ingredient_id
+                            WHERE ri.recipe_id = core_recipe.id
+                       ), '[]'::jsonb)
+                   )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,9 +1,16 @@
 import uuid
 import os
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Concat
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from app import settings
 
 
@@ -52,18 +59,114 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+class CollectionVersionManager(models.Manager):
+    def stamp(self, user, collections):
+        """Return the versions and last change time of user's collections
+
+        Missing rows are created at version 0, so that every later change
+        bumps a row that readers have already seen.
+        """
+        rows = list(self.filter(user=user, collection__in=collections))
+        if len(rows) < len(collections):
+            self.bulk_create(
+                [self.model(user=user, collection=c) for c in collections],
+                ignore_conflicts=True
+            )
+            rows = list(self.filter(user=user, collection__in=collections))
+        rows.sort(key=lambda row: row.collection)
+        versions = tuple((row.collection, row.version) for row in rows)
+        return versions, max(row.updated_at for row in rows)
+
+    def bump(self, user_id, *collections):
+        """Record a change to the given collections of a user"""
+        self.filter(user_id=user_id, collection__in=collections).update(
+            version=models.F("version") + 1,
+            updated_at=timezone.now()
+        )
+
+
+class CollectionVersion(models.Model):
+    """Version stamp of a user's collection of tags, ingredients or recipes
+
+    Every change to an item of the collection, including changes to the
+    relations of a recipe, increments the version, so that readers can
+    tell whether their copy is current without reading the items.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False
+    )
+    collection = models.CharField(max_length=32)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CollectionVersionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "collection"],
+                name="core_collectionversion_user_collection_uniq"
+            ),
+        ]
+
+
+class ImageBlobManager(models.Manager):
+    def add_references(self, counts):
+        """Apply a mapping of blob names to reference count changes"""
+        self.bulk_create(
+            [self.model(name=name) for name, delta in counts.items()
+             if delta > 0],
+            ignore_conflicts=True
+        )
+        by_delta = {}
+        for name, delta in counts.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(name)
+        for delta, names in by_delta.items():
+            self.filter(name__in=names).update(
+                references=models.F("references") + delta
+            )
+
+
+class ImageBlob(models.Model):
+    """Number of references to a file of the content addressed storage
+
+    Files no longer referenced are removed by collect_image_blobs.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    references = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImageBlobManager()
+
+    def __str__(self):
+        return self.name
+
+
 class AbstractBaseItem(models.Model):
     name = models.CharField(max_length=255)
+    # per-user lookups are served by the composite indexes declared in Meta
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
     class Meta:
         abstract = True
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="%(app_label)s_%(class)s_user_name_uniq"
+            ),
+        ]
 
 
 class Tag(AbstractBaseItem):
@@ -74,8 +177,170 @@ class Ingredient(AbstractBaseItem):
     """Ingredient to be used in a recipe"""
 
 
+SEARCH_CONFIG = "english"
+
+# items of one relation of core_recipe as a jsonb array of {id, name}
+SUMMARY_ITEMS_SQL = """COALESCE((
+    SELECT jsonb_agg(
+               jsonb_build_object('id', item.id, 'name', item.name)
+               ORDER BY item.id
+           )
+      FROM {through} link
+      JOIN {table} item ON item.id = link.{column}
+     WHERE link.recipe_id = core_recipe.id
+), '[]'::jsonb)"""
+
+
+def empty_recipe_summary():
+    return {"tags": [], "ingredients": []}
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queryset that loads what the recipe serializers need in bulk"""
+
+    SERIALIZED_FIELDS = ("id", "user", "title", "time_minutes", "price",
+                         "link", "image", "image_status", "image_thumbnail",
+                         "image_medium", "image_webp")
+
+    # serialized fields stored in other columns, or none for relations
+    FIELD_COLUMNS = {
+        "image_variants": ("image_thumbnail", "image_medium", "image_webp"),
+        "tags": (),
+        "ingredients": (),
+    }
+    RELATIONS = ("tags", "ingredients")
+
+    def for_list(self, fields=None, expand=()):
+        """Load the serialized columns and the related objects
+
+        Only the columns of `fields`, all when None, are loaded. Relations
+        in `expand` are loaded with the columns they are nested with, the
+        other serialized ones with their ids only.
+        """
+        prefetches = []
+        for relation in self.RELATIONS:
+            if fields is not None and relation not in fields:
+                continue
+            related = self.model._meta.get_field(relation).related_model
+            columns = ("id", "name", "user") if relation in expand \
+                else ("id",)
+            prefetches.append(models.Prefetch(
+                relation, queryset=related.objects.only(*columns)
+            ))
+        return self.only(*self._serialized_columns(fields)) \
+            .prefetch_related(*prefetches)
+
+    def for_summary_list(self, fields=None):
+        """Load serialized columns and the summary in place of relations"""
+        columns = self._serialized_columns(fields)
+        if fields is None or set(fields) & set(self.RELATIONS):
+            columns.append("summary")
+        return self.only(*columns)
+
+    def _serialized_columns(self, fields):
+        if fields is None:
+            return list(self.SERIALIZED_FIELDS)
+        columns = ["id", "user"]
+        for field in fields:
+            columns.extend(self.FIELD_COLUMNS.get(field, (field,)))
+        return columns
+
+    def update_search(self):
+        """Recompute the search columns from titles and related names
+
+        Runs as a single UPDATE, so it sends no signals and can be applied
+        to many recipes at once.
+        """
+        return self.update(**self._search_values())
+
+    def update_summary(self):
+        """Recompute the summary column from the related tags and ingredients
+
+        Runs as a single UPDATE, like update_search.
+        """
+        return self.update(summary=self.summary_expression())
+
+    def update_related(self):
+        """Recompute the search and summary columns in a single UPDATE
+
+        Used when the relations of recipes or the names of their items
+        change, as both columns depend on them.
+        """
+        return self.update(
+            summary=self.summary_expression(),
+            **self._search_values()
+        )
+
+    def summary_expression(self):
+        """Return the SQL building the summary of every recipe row"""
+        items = []
+        for field in ("tags", "ingredients"):
+            relation = self.model._meta.get_field(field)
+            through = relation.remote_field.through._meta
+            items.append(SUMMARY_ITEMS_SQL.format(
+                through=through.db_table,
+                table=relation.related_model._meta.db_table,
+                column=through.get_field(
+                    relation.m2m_reverse_field_name()
+                ).column
+            ))
+        return RawSQL(
+            "jsonb_build_object('tags', {}, 'ingredients', {})".format(
+                *items
+            ),
+            (),
+            output_field=JSONField()
+        )
+
+    def _search_values(self):
+        tags = self._related_names(self.model.tags.through, "tag")
+        ingredients = self._related_names(
+            self.model.ingredients.through,
+            "ingredient"
+        )
+        return dict(
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector(ingredients, weight="B", config=SEARCH_CONFIG)
+                + SearchVector(tags, weight="C", config=SEARCH_CONFIG)
+            ),
+            search_text=Concat(
+                "title",
+                models.Value(" "),
+                Coalesce(ingredients, models.Value("")),
+                models.Value(" "),
+                Coalesce(tags, models.Value("")),
+                output_field=models.TextField()
+            )
+        )
+
+    def _related_names(self, through, field):
+        """Return a subquery joining the names of a recipe's relations"""
+        return models.Subquery(
+            through.objects.filter(recipe_id=models.OuterRef("pk"))
+            .values("recipe_id")
+            .annotate(names=StringAgg(f"{field}__name", " "))
+            .values("names"),
+            output_field=models.TextField()
+        )
+
+    def for_detail(self, fields=None, expand=RELATIONS):
+        """Load serialized columns and the related objects nested in detail"""
+        return self.for_list(fields, expand)
+
+
 class Recipe(AbstractBaseItem):
     """Recipes model"""
+    IMAGE_PENDING = "pending"
+    IMAGE_PROCESSING = "processing"
+    IMAGE_READY = "ready"
+    IMAGE_FAILED = "failed"
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, "Pending"),
+        (IMAGE_PROCESSING, "Processing"),
+        (IMAGE_READY, "Ready"),
+        (IMAGE_FAILED, "Failed"),
+    )
 
     name = None
     title = models.CharField(max_length=255)
@@ -85,7 +350,61 @@ class Recipe(AbstractBaseItem):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to="recipe_image_file_path")
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    image_thumbnail = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path
+    )
+    image_medium = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path
+    )
+    image_webp = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path
+    )
+
+    IMAGE_FIELDS = ("image", "image_thumbnail", "image_medium", "image_webp")
+    # maintained by RecipeQuerySet.update_search from the title and the
+    # names of the ingredients and tags, see core.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    search_text = models.TextField(blank=True, editable=False)
+    # read model of the list view, the ids and names of the tags and
+    # ingredients, maintained by RecipeQuerySet.update_summary
+    summary = JSONField(default=empty_recipe_summary, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "id"],
+                name="core_recipe_user_id_idx"
+            ),
+            GinIndex(
+                fields=["search_vector"],
+                name="core_recipe_search_vector_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.stored_images = instance.image_names()
+        return instance
+
+    def image_names(self):
+        """Return the file names of the loaded image fields"""
+        return {
+            field: getattr(self, field).name or None
+            for field in self.IMAGE_FIELDS
+            if field in self.__dict__
+        }
@@ -0,0 +1,154 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.core.cache import caches
+
+
+class SlidingWindowCounter:
+    """Count events per key over a sliding window in a shared cache
+
+    The sliding window is approximated from two fixed windows, weighting
+    the count of the previous one by the part of it still inside the
+    sliding window. Keys are hashed, so they may hold any text.
+    """
+
+    def __init__(self, prefix, limit, window, alias="default"):
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def count(self, key, now=None):
+        """Return the approximate number of events in the window"""
+        current, previous, elapsed = self._windows(key, now)
+        counts = self.cache.get_many([current, previous])
+        weight = 1 - elapsed / self.window
+        return counts.get(current, 0) + counts.get(previous, 0) * weight
+
+    def retry_after(self, key, now=None):
+        """Return the seconds to wait once the limit is reached, else None"""
+        if self.count(key, now) < self.limit:
+            return None
+        _, _, elapsed = self._windows(key, now)
+        return max(1, math.ceil(self.window - elapsed))
+
+    def add(self, key, now=None):
+        """Record an event"""
+        current, _, _ = self._windows(key, now)
+        # the previous window is still read during the next one
+        self.cache.add(current, 0, 2 * self.window)
+        try:
+            self.cache.incr(current)
+        except ValueError:
+            # expired between add and incr
+            self.cache.set(current, 1, 2 * self.window)
+
+    def reset(self, key, now=None):
+        current, previous, _ = self._windows(key, now)
+        self.cache.delete_many([current, previous])
+
+    def _windows(self, key, now):
+        now = time.time() if now is None else now
+        index, elapsed = divmod(now, self.window)
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        prefix = f"{self.prefix}:{digest}"
+        return f"{prefix}:{int(index)}", f"{prefix}:{int(index) - 1}", \
+            elapsed
+
+
+class TokenBucket:
+    """Token buckets kept in a shared cache
+
+    A bucket holds up to `capacity` tokens and refills at `rate` tokens
+    per second; a missing bucket is full, so entries expire once they
+    would have refilled. Every update of a bucket holds its lock, taken
+    with cache.add, for up to `lock_wait` seconds; past that the update
+    goes ahead unlocked rather than stall the request.
+    """
+    lock_wait = 0.05
+    poll_interval = 0.005
+
+    def __init__(self, prefix, alias="default"):
+        self.prefix = prefix
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def consume(self, key, capacity, rate, cost=1, now=None):
+        """Take `cost` tokens, returning None or the seconds to wait"""
+        cost = min(cost, capacity)
+        key = f"{self.prefix}:{hashlib.sha256(key.encode()).hexdigest()}"
+        lock_key = key + ":lock"
+        locked = self._lock(lock_key)
+        try:
+            now = time.time() if now is None else now
+            tokens, updated = self.cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - updated) * rate)
+            wait = None
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self.cache.set(
+                key, (tokens, now), math.ceil((capacity - tokens) / rate) + 1
+            )
+            return wait
+        finally:
+            if locked:
+                self.cache.delete(lock_key)
+
+    def _lock(self, lock_key):
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(lock_key, 1, 1):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+
+class ConcurrencyLimiter:
+    """Bound the work done at once by the threads of a process
+
+    Up to `limit` callers hold a slot; up to `max_queue` more wait for one
+    for at most `timeout` seconds.
+    """
+
+    def __init__(self, limit, max_queue, timeout):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.queued = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Take a slot, returning False if the queue is full or times out"""
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.queued >= self.max_queue:
+                return False
+            self.queued += 1
+            try:
+                acquired = self._condition.wait_for(
+                    lambda: self.active < self.limit, self.timeout
+                )
+                if acquired:
+                    self.active += 1
+                return acquired
+            finally:
+                self.queued -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
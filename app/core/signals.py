@@ -0,0 +1,180 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token
+from core.models import CollectionVersion, ImageBlob, Tag, Ingredient, \
+    Recipe
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a token as soon as it is deleted"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached tokens so a deactivated or updated user is reloaded"""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance) \
+            .values_list("key", flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_collection_versions(sender, instance, created, **kwargs):
+    """Start version stamps of a new user's collections"""
+    if created:
+        CollectionVersion.objects.bulk_create([
+            CollectionVersion(user=instance, collection=model._meta.model_name)
+            for model in (Tag, Ingredient, Recipe)
+        ])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def bump_item_collection(sender, instance, **kwargs):
+    """Record a change to the collection the item belongs to"""
+    CollectionVersion.objects.bump(instance.user_id, sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_recipe_relations(sender, instance, action, **kwargs):
+    """Record a change to the tags or ingredients of recipes"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        CollectionVersion.objects.bump(
+            instance.user_id,
+            Recipe._meta.model_name
+        )
+
+
+def _saved_image_fields(update_fields):
+    if update_fields is None:
+        return Recipe.IMAGE_FIELDS
+    return [field for field in Recipe.IMAGE_FIELDS if field in update_fields]
+
+
+@receiver(pre_save, sender=Recipe)
+def load_stored_images(sender, instance, update_fields=None, **kwargs):
+    """Look up the stored image names the instance was not loaded with"""
+    if instance._state.adding:
+        instance.stored_images = {}
+        return
+    stored = getattr(instance, "stored_images", {})
+    missing = [
+        field for field in _saved_image_fields(update_fields)
+        if field not in stored
+    ]
+    if missing:
+        row = Recipe.objects.filter(pk=instance.pk).values(*missing).first()
+        stored.update({
+            field: name or None for field, name in (row or {}).items()
+        })
+        instance.stored_images = stored
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_references(sender, instance, update_fields=None, **kwargs):
+    """Move blob references from the replaced images to the new ones"""
+    stored = instance.stored_images
+    counts = Counter()
+    for field in _saved_image_fields(update_fields):
+        old = stored.get(field)
+        new = getattr(instance, field).name or None
+        if old != new:
+            if old:
+                counts[old] -= 1
+            if new:
+                counts[new] += 1
+        stored[field] = new
+    if any(counts.values()):
+        ImageBlob.objects.add_references(counts)
+
+
+@receiver(pre_delete, sender=Recipe)
+def release_image_references(sender, instance, **kwargs):
+    """Drop the blob references of a deleted recipe"""
+    counts = Counter(
+        getattr(instance, field).name for field in Recipe.IMAGE_FIELDS
+        if getattr(instance, field)
+    )
+    if counts:
+        ImageBlob.objects.add_references(
+            {name: -count for name, count in counts.items()}
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, update_fields=None, **kwargs):
+    """Index the title of a saved recipe"""
+    if update_fields is None or "title" in update_fields:
+        Recipe.objects.filter(pk=instance.pk).update_search()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_related_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Reindex and resummarize recipes whose relations change"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            Recipe.objects.filter(pk=instance.pk).update_related()
+        return
+    if action == "pre_clear":
+        instance.cleared_recipe_ids = list(
+            instance.recipe_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        pk_set = instance.__dict__.pop("cleared_recipe_ids", [])
+    if action in ("post_add", "post_remove", "post_clear") and pk_set:
+        Recipe.objects.filter(pk__in=pk_set).update_related()
+
+
+@receiver(pre_save, sender=Tag)
+@receiver(pre_save, sender=Ingredient)
+def check_item_renamed(sender, instance, update_fields=None, **kwargs):
+    """Remember whether a saved tag or ingredient changes its name"""
+    if instance.pk is None or instance._state.adding:
+        return
+    if update_fields is not None and "name" not in update_fields:
+        return
+    instance.renamed = not sender.objects.filter(
+        pk=instance.pk, name=instance.name
+    ).exists()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_item_recipes(sender, instance, created, **kwargs):
+    """Carry the new name of a tag or ingredient into its recipes"""
+    if instance.__dict__.pop("renamed", False) and not created:
+        instance.recipe_set.all().update_related()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_item_recipes(sender, instance, **kwargs):
+    """Remember the recipes of an item before its relations are deleted"""
+    instance.deleted_recipe_ids = list(
+        instance.recipe_set.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_deleted_item_recipes(sender, instance, **kwargs):
+    """Drop a deleted tag or ingredient from its recipes"""
+    recipe_ids = getattr(instance, "deleted_recipe_ids", None)
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update_related()
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping a single copy of every distinct file
+
+    A file is stored under the directory its upload_to path points at, in
+    a tree sharded by the first bytes of its SHA-256 digest and named
+    after that digest, e.g. ``upload/recipe/ab/cd/abcd....jpg``. Saving
+    content that is already stored writes nothing and returns the name of
+    the existing copy. Files are shared, so they must only be deleted by
+    the collect_image_blobs command once no ImageBlob references them.
+    """
+    chunk_size = 64 * 2 ** 10
+    shard_depth = 2
+
+    def blob_name(self, name, digest):
+        """Return the name of the blob holding content with this digest"""
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(directory, *shards, digest + ext)
+
+    def get_available_name(self, name, max_length=None):
+        # blob names are derived from their content and never collide
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, "temporary_file_path"):
+            # the upload is already on disk, so only read it to hash it
+            source = content.temporary_file_path()
+            digest = self._hash(content)
+            temporary = False
+        else:
+            source, digest = self._spool(content, directory)
+            temporary = True
+
+        blob = self.blob_name(name, digest)
+        path = self.path(blob)
+        if os.path.exists(path):
+            # refresh the blob so that garbage collection spares it
+            os.utime(path)
+            if temporary:
+                os.remove(source)
+            return blob
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if temporary:
+            os.replace(source, path)
+        else:
+            file_move_safe(source, path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        return blob
+
+    def _hash(self, content):
+        sha = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(self.chunk_size):
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def _spool(self, content, directory):
+        """Write content next to its destination, hashing it meanwhile"""
+        sha = hashlib.sha256()
+        fd, path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(self.chunk_size):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    sha.update(chunk)
+                    spool.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, sha.hexdigest()
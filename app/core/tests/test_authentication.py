@@ -0,0 +1,118 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.authentication import local_token_cache, LocalTTLCache, \
+    token_cache_key
+from core.helpers import create_user
+
+ME_URL = reverse("user:me")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication"""
+
+    def setUp(self):
+        local_token_cache.clear()
+        cache.clear()
+        self.user = create_user(name="Test name")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_is_cached(self):
+        """Test that repeated requests do not query the token again"""
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_shared_cache_used_after_local_miss(self):
+        """Test that the shared cache answers when the local tier misses"""
+        self.client.get(ME_URL)
+        local_token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_rejected(self):
+        """Test that a deleted token stops authenticating"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a user invalidates its cached tokens"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        """Test that unknown tokens are rejected and not cached"""
+        self.client.credentials(HTTP_AUTHORIZATION="Token unknown")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_without_password(self):
+        """Test the cache holds plain data without the password hash"""
+        self.client.get(ME_URL)
+
+        data = json.loads(cache.get(token_cache_key(self.token.key)))
+
+        self.assertEqual(data["user"]["email"], self.user.email)
+        self.assertNotIn("password", data["user"])
+        self.assertNotIn(self.user.password, json.dumps(data))
+
+    def test_cached_user_update_keeps_password(self):
+        """Test saving a user rebuilt from the cache keeps its password"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {"name": "New name"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, "New name")
+        self.assertTrue(self.user.check_password("123456"))
+
+
+class LocalTTLCacheTests(TestCase):
+    """Test the in-process token cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test that the oldest entry is evicted when full"""
+        local = LocalTTLCache(maxsize=2, ttl=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+
+        self.assertEqual(local.get("a"), 1)
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.get("c"), 3)
+
+    def test_expired_entry_dropped(self):
+        """Test that entries are not returned after their TTL"""
+        local = LocalTTLCache(maxsize=2, ttl=0)
+        local.set("a", 1)
+
+        self.assertIsNone(local.get("a"))
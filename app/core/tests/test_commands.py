@@ -1,23 +1,130 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+
+ENSURE_CONNECTION = "django.db.backends.base.base.BaseDatabaseWrapper." \
+                    "ensure_connection"
+MIGRATION_PLAN = "django.db.migrations.executor.MigrationExecutor." \
+                 "migration_plan"
 
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 1)
+        out = StringIO()
+        with patch(ENSURE_CONNECTION) as ec:
+            call_command("wait_for_db", stdout=out)
+            self.assertEqual(ec.call_count, 1)
+        self.assertIn("Database available after", out.getvalue())
 
     @patch("time.sleep", return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+        self.assertEqual(ts.call_count, 5)
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        """Test retry delays grow exponentially up to the maximum delay"""
+        with patch(ENSURE_CONNECTION) as ec, \
+                patch("random.uniform", side_effect=lambda a, b: b):
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command(
+                "wait_for_db",
+                initial_delay=1,
+                max_delay=6,
+                stdout=StringIO()
+            )
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, [1, 2, 4, 6, 6])
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test giving up once the deadline has passed"""
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = OperationalError("connection refused")
+            with self.assertRaisesMessage(CommandError, "refused"):
+                call_command("wait_for_db", timeout=0, stdout=StringIO())
+        ts.assert_not_called()
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_migrations(self, ts):
+        """Test waiting until migrations are applied"""
+        with patch(MIGRATION_PLAN) as mp:
+            mp.side_effect = [[("migration", False)], []]
+            call_command("wait_for_db", migrations=True, stdout=StringIO())
+            self.assertEqual(mp.call_count, 2)
+        self.assertEqual(ts.call_count, 1)
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_seed_bench(self):
+        """Test users are seeded with tokens and topped up catalogues"""
+        options = {"users": 2, "recipes": 3, "tags": 4, "ingredients": 5,
+                   "fanout": 2, "stdout": StringIO()}
+        call_command("seed_bench", **options)
+        call_command("seed_bench", **{**options, "recipes": 4})
+
+        recipes = Recipe.objects.filter(user__email="bench1@ryszyydev.com")
+        self.assertEqual(recipes.count(), 4)
+        self.assertEqual(Token.objects.count(), 2)
+        self.assertEqual(recipes.first().tags.count(), 2)
+        self.assertEqual(len(recipes.first().summary["ingredients"]), 2)
+
+    def test_bench_api_against_baseline(self):
+        """Test results are saved and compared with a baseline"""
+        call_command("seed_bench", users=1, recipes=5, stdout=StringIO())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        baseline = os.path.join(directory.name, "baseline.json")
+        options = {"scenario": ["list", "create", "token"], "requests": 3}
+        out = StringIO()
+
+        call_command("bench_api", save=baseline, stdout=out, **options)
+
+        self.assertIn("create        3 ok 0 failed", out.getvalue())
+        with open(baseline) as f:
+            results = json.load(f)
+        self.assertEqual(set(results), {"list", "create", "token"})
+        self.assertEqual(Recipe.objects.count(), 5)
+
+        results["create"]["queries"] -= 1
+        with open(baseline, "w") as f:
+            json.dump(results, f)
+        with self.assertRaisesMessage(CommandError, "create"):
+            call_command(
+                "bench_api", baseline=baseline, max_regression=1000,
+                stdout=StringIO(), **options
+            )
+
+    def test_bench_api_unthrottled(self):
+        """Test benchmarks send more requests than the throttles allow"""
+        call_command("seed_bench", users=1, recipes=5, stdout=StringIO())
+        out = StringIO()
+        rates = {"recipe": "1/min", "tag": "1/min", "ingredient": "1/min"}
+
+        with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates
+        }):
+            call_command(
+                "bench_api", scenario=["list", "detail"], requests=5,
+                stdout=out
+            )
+
+        self.assertIn("list          5 ok 0 failed", out.getvalue())
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import psycopg2
+from django.db import connection, connections
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.pooled_postgresql.base import pool_stats
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    databases = {"default"}
+
+    def setUp(self):
+        params = connection.get_connection_params()
+        self.pool = ConnectionPool(
+            lambda: psycopg2.connect(**params),
+            max_size=2,
+            timeout=0.05
+        )
+        self.addCleanup(self.pool.close)
+
+    def test_reuses_returned_connections(self):
+        """Test a returned connection is handed out again"""
+        first = self.pool.checkout()
+        self.pool.checkin(first)
+        second = self.pool.checkout()
+        self.pool.checkin(second)
+
+        self.assertIs(first, second)
+        stats = self.pool.stats()
+        self.assertEqual(stats["opened"], 1)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_pool_is_bounded(self):
+        """Test checkouts beyond max_size time out"""
+        held = [self.pool.checkout(), self.pool.checkout()]
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.checkout()
+        self.assertEqual(self.pool.stats()["timeouts"], 1)
+        for conn in held:
+            self.pool.checkin(conn)
+
+    def test_drops_closed_connections(self):
+        """Test connections closed while idle are replaced on checkout"""
+        first = self.pool.checkout()
+        self.pool.checkin(first)
+        first.close()
+
+        second = self.pool.checkout()
+        self.pool.checkin(second)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(self.pool.stats()["discarded"], 1)
+
+    def test_health_check_after_idle_interval(self):
+        """Test idle connections are pinged before being reused"""
+        self.pool.check_interval = 0
+        conn = self.pool.checkout()
+        self.pool.checkin(conn)
+
+        self.assertIs(self.pool.checkout(), conn)
+        self.assertEqual(self.pool.stats()["checks"], 1)
+        self.pool.checkin(conn)
+
+    def test_rolls_back_open_transactions(self):
+        """Test a connection returned inside a transaction is cleaned up"""
+        conn = self.pool.checkout()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.pool.checkin(conn)
+
+        self.assertEqual(
+            conn.get_transaction_status(),
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        )
+
+
+class PooledDatabaseWrapperTests(SimpleTestCase):
+    databases = {"default"}
+
+    def test_close_returns_connection_to_pool(self):
+        """Test closing the Django connection keeps it open in the pool"""
+        settings_dict = {
+            **connection.settings_dict,
+            "ENGINE": "core.db.pooled_postgresql",
+            "POOL": {"MAX_SIZE": 1},
+        }
+        databases = patch.dict(connections.databases, pooled=settings_dict)
+        databases.start()
+        self.addCleanup(databases.stop)
+        wrapper = connections["pooled"]
+        self.addCleanup(connections.__delitem__, "pooled")
+        self.addCleanup(lambda: wrapper.pool.close())
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        raw = wrapper.connection
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertTrue(
+            wrapper.settings_dict["DISABLE_SERVER_SIDE_CURSORS"]
+        )
+        self.assertEqual(pool_stats()["pooled"]["reused"], 1)
+        wrapper.close()
@@ -0,0 +1,144 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.helpers import create_user
+from core.metrics import (
+    MetricsRegistry, RequestMetrics, fingerprint, registry
+)
+from core.models import Recipe, Tag
+
+METRICS_URL = reverse("metrics")
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+ME_URL = reverse("user:me")
+
+
+class MetricsRegistryTests(SimpleTestCase):
+
+    def test_render_histogram(self):
+        """Test histograms are rendered with cumulative buckets"""
+        metrics = MetricsRegistry()
+        metrics.observe("latency", {"view": "V"}, 0.2, buckets=(0.1, 1))
+        metrics.observe("latency", {"view": "V"}, 0.05, buckets=(0.1, 1))
+
+        text = metrics.render()
+
+        self.assertIn("# TYPE latency histogram", text)
+        self.assertIn('latency_bucket{view="V",le="0.1"} 1', text)
+        self.assertIn('latency_bucket{view="V",le="1"} 2', text)
+        self.assertIn('latency_bucket{view="V",le="+Inf"} 2', text)
+        self.assertIn('latency_count{view="V"} 2', text)
+
+    def test_render_collectors(self):
+        """Test collector samples are read on every render"""
+        metrics = MetricsRegistry()
+        value = [1]
+        metrics.register(lambda: [("items", "gauge", {}, value[0])])
+        self.assertIn("items 1", metrics.render())
+
+        value[0] = 2
+
+        self.assertIn("items 2", metrics.render())
+
+    def test_fingerprint(self):
+        """Test queries differing in parameters share a fingerprint"""
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE id IN (%s, %s) LIMIT 21'),
+            fingerprint('SELECT *\n FROM "t" WHERE id IN (%s) LIMIT 5'),
+        )
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_records_per_view_and_action(self):
+        """Test queries and timings are observed per view and action"""
+        Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price=1
+        )
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.get(ME_URL)
+
+        count, queries = registry.histogram(
+            "http_request_queries", view="RecipeViewSet", action="list"
+        )
+        self.assertEqual(count, 2)
+        self.assertGreater(queries, 0)
+        count, serializing = registry.histogram(
+            "http_request_serializer_seconds",
+            view="RecipeViewSet", action="list"
+        )
+        self.assertGreater(serializing, 0)
+        self.assertEqual(registry.histogram(
+            "http_request_render_seconds", view="ManageUserView", action="get"
+        )[0], 1)
+        self.assertEqual(registry.histogram(
+            "http_response_size_bytes", view="ManageUserView", action="get"
+        )[0], 1)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged(self):
+        """Test requests over the latency threshold are logged"""
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get(ME_URL)
+
+        self.assertIn("(ManageUserView.get)", logs.output[0])
+
+    def test_repeated_queries(self):
+        """Test queries repeated with other parameters are reported"""
+        request_metrics = RequestMetrics()
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ("Vegan", "Quick")]
+
+        with connection.execute_wrapper(request_metrics):
+            for tag in tags:
+                Tag.objects.get(pk=tag.pk)
+            Recipe.objects.count()
+
+        self.assertEqual(request_metrics.queries, 3)
+        [(sql, count)] = request_metrics.duplicates()
+        self.assertEqual(count, 2)
+        self.assertIn('FROM "core_tag"', sql)
+
+
+class MetricsViewTests(TestCase):
+
+    def test_disabled_without_token(self):
+        """Test the endpoint does not exist while no token is set"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requires_token(self):
+        """Test scrapes need the bearer token"""
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer no")
+
+        self.assertEqual(res.status_code, 401)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_exposes_metrics(self):
+        """Test request histograms and collected stats are exposed"""
+        self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        text = res.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{action="get",'
+                      'view="metrics_view",le="+Inf"}', text)
+        self.assertIn("response_cache_hits_total", text)
+        self.assertIn("autocomplete_keys", text)
@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -63,6 +64,22 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test that the database rejects duplicate tag names for a user"""
+        user = sample_user()
+        models.Tag.objects.create(user=user, name="meat")
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="meat")
+
+    def test_ingredient_name_unique_per_user(self):
+        """Test that the database rejects duplicate ingredients for a user"""
+        user = sample_user()
+        models.Ingredient.objects.create(user=user, name="salt")
+
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name="salt")
+
     def test_recipe_str(self):
         """Test that string of recipe is displayed"""
         recipe = models.Recipe.objects.create(
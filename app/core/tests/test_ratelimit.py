@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.ratelimit import SlidingWindowCounter
+
+
+class SlidingWindowCounterTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.counter = SlidingWindowCounter("test", limit=4, window=60)
+
+    def test_previous_window_is_weighted(self):
+        """Test events of the previous window fade out as time passes"""
+        for _ in range(4):
+            self.counter.add("key", now=590)
+
+        self.assertEqual(self.counter.count("key", now=600), 4)
+        self.assertEqual(self.counter.count("key", now=615), 3)
+        self.assertEqual(self.counter.count("key", now=660), 0)
+        self.assertEqual(self.counter.count("other", now=600), 0)
+
+    def test_retry_after(self):
+        """Test the wait is given once the limit is reached"""
+        for _ in range(3):
+            self.counter.add("key", now=600)
+        self.assertIsNone(self.counter.retry_after("key", now=610))
+
+        self.counter.add("key", now=610)
+
+        self.assertEqual(self.counter.retry_after("key", now=610), 50)
+        self.counter.reset("key", now=610)
+        self.assertIsNone(self.counter.retry_after("key", now=610))
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.helpers import create_user
+from core.models import ImageBlob, Recipe
+from core.storage import ContentAddressedStorage
+
+
+class StorageTestCase(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+
+class ContentAddressedStorageTests(StorageTestCase):
+
+    def test_save_shards_by_digest(self):
+        """Test files are named and sharded after their SHA-256 digest"""
+        storage = ContentAddressedStorage()
+        name = storage.save("upload/recipe/photo.JPG", ContentFile(b"img"))
+
+        digest = hashlib.sha256(b"img").hexdigest()
+        self.assertEqual(
+            name,
+            f"upload/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        )
+        with storage.open(name) as stored:
+            self.assertEqual(stored.read(), b"img")
+
+    def test_save_same_content_once(self):
+        """Test saving identical content twice keeps a single file"""
+        storage = ContentAddressedStorage()
+        first = storage.save("upload/recipe/a.jpg", ContentFile(b"same"))
+        second = storage.save("upload/recipe/b.jpg", ContentFile(b"same"))
+        other = storage.save("upload/recipe/c.jpg", ContentFile(b"other"))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(self.files(), sorted([first, other]))
+
+
+class ImageReferenceTests(StorageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+
+    def recipe(self, content=None):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Recipe",
+            time_minutes=5,
+            price=5
+        )
+        if content is not None:
+            recipe.image.save("photo.jpg", ContentFile(content))
+        return recipe
+
+    def references(self, name):
+        return ImageBlob.objects.get(name=name).references
+
+    def test_recipes_share_references(self):
+        """Test recipes storing the same image reference one blob"""
+        first = self.recipe(b"photo")
+        second = self.recipe(b"photo")
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.references(first.image.name), 2)
+
+        second.delete()
+        self.assertEqual(self.references(first.image.name), 1)
+
+    def test_replacing_image_moves_reference(self):
+        """Test replacing an image releases the previous blob"""
+        recipe = self.recipe(b"before")
+        before = recipe.image.name
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.image.save("photo.jpg", ContentFile(b"after"))
+
+        self.assertEqual(self.references(before), 0)
+        self.assertEqual(self.references(recipe.image.name), 1)
+
+    def test_collect_unreferenced_blobs(self):
+        """Test garbage collection deletes only unreferenced blobs"""
+        kept = self.recipe(b"kept")
+        dropped = self.recipe(b"dropped")
+        dropped_name = dropped.image.name
+        dropped.delete()
+
+        call_command("collect_image_blobs", grace=0, stdout=StringIO())
+
+        self.assertEqual(self.files(), [kept.image.name])
+        self.assertFalse(ImageBlob.objects.filter(name=dropped_name).exists())
+
+    def test_collect_spares_recent_blobs(self):
+        """Test garbage collection keeps blobs within the grace period"""
+        recipe = self.recipe(b"recent")
+        name = recipe.image.name
+        recipe.delete()
+
+        call_command("collect_image_blobs", stdout=StringIO())
+
+        self.assertEqual(self.files(), [name])
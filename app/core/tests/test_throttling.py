@@ -0,0 +1,220 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user, sample_recipe
+from core.middleware import AdmissionControlMiddleware
+from core.ratelimit import ConcurrencyLimiter, TokenBucket
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket("test")
+
+    def consume(self, key="key", cost=1, now=100):
+        return self.bucket.consume(key, capacity=3, rate=1, cost=cost,
+                                   now=now)
+
+    def test_bucket_refills(self):
+        """Test tokens run out and come back at the rate"""
+        self.assertIsNone(self.consume(cost=2))
+        self.assertIsNone(self.consume())
+        self.assertEqual(self.consume(), 1)
+        self.assertIsNone(self.consume("other"))
+
+        self.assertIsNone(self.consume(cost=2, now=102))
+        self.assertEqual(self.consume(now=102), 1)
+
+    def test_cost_above_capacity(self):
+        """Test a cost larger than the bucket takes the whole bucket"""
+        self.assertIsNone(self.consume(cost=10))
+        self.assertEqual(self.consume(), 1)
+
+
+THROTTLED = {
+    "DEFAULT_PAGINATION_CLASS": "recipe.pagination.KeysetPagination",
+    "PAGE_SIZE": 100,
+    "DEFAULT_THROTTLE_CLASSES": ["core.throttling.TokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "recipe": "10/min", "tag": "10/min", "ingredient": "10/min",
+    },
+}
+
+
+@override_settings(REST_FRAMEWORK=THROTTLED)
+class ThrottleApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_actions_cost_tokens(self):
+        """Test lists drain the bucket faster than retrieves"""
+        recipe = sample_recipe(self.user)
+        self.client.get(RECIPES_URL)
+        for _ in range(5):
+            res = self.client.get(detail_url(recipe.id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "6")
+
+    def test_buckets_per_user_and_endpoint(self):
+        """Test other users and other endpoints keep their tokens"""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(self.client.get(RECIPES_URL).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(TAGS_URL).status_code,
+                         status.HTTP_200_OK)
+        other = APIClient()
+        other.force_authenticate(create_user(email="other@ryszyydev.com"))
+        self.assertEqual(other.get(RECIPES_URL).status_code,
+                         status.HTTP_200_OK)
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+
+    def test_queue_is_bounded(self):
+        """Test callers beyond the slots and the queue are turned away"""
+        limiter = ConcurrencyLimiter(1, max_queue=1, timeout=5)
+        self.assertTrue(limiter.acquire())
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(limiter.acquire())
+        )
+        waiter.start()
+        while not limiter.queued:
+            pass
+
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        waiter.join()
+        self.assertEqual(results, [True])
+
+    def test_wait_times_out(self):
+        """Test queued callers give up after the timeout"""
+        limiter = ConcurrencyLimiter(1, max_queue=1, timeout=0.01)
+        limiter.acquire()
+
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.queued, 0)
+
+
+@override_settings(ADMISSION_MAX_CONCURRENCY=1, ADMISSION_MAX_QUEUE=0,
+                   ADMISSION_RETRY_AFTER=3)
+class AdmissionControlMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.response = HttpResponse()
+        self.middleware = AdmissionControlMiddleware(lambda r: self.response)
+        self.request = RequestFactory().get(RECIPES_URL)
+
+    def test_sheds_load_when_busy(self):
+        """Test requests without a free slot are answered 503"""
+        self.middleware.limiter.acquire()
+
+        res = self.middleware(self.request)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "3")
+        self.assertIs(
+            self.middleware(RequestFactory().get("/admin/")), self.response
+        )
+
+    def test_slot_released(self):
+        """Test slots are released with the response"""
+        self.assertIs(self.middleware(self.request), self.response)
+        self.assertEqual(self.middleware.limiter.active, 0)
+
+        self.response = StreamingHttpResponse(iter([b"data"]))
+        res = self.middleware(self.request)
+
+        self.assertEqual(self.middleware.limiter.active, 1)
+        res.close()
+        self.assertEqual(self.middleware.limiter.active, 0)
+
+    @override_settings(ADMISSION_MAX_CONCURRENCY=3, ADMISSION_MAX_QUEUE=0)
+    def test_sheds_server_queue(self):
+        """Test a free server thread drains its queue while slots are busy
+
+        Requests queue in the thread pool of a gunicorn gthread worker
+        with 4 threads, out of sight of the middleware.
+        """
+        release = threading.Event()
+        served = threading.Semaphore(0)
+
+        def view(request):
+            served.release()
+            release.wait(5)
+            return HttpResponse()
+
+        middleware = AdmissionControlMiddleware(view)
+        with ThreadPoolExecutor(4) as pool:
+            futures = [
+                pool.submit(middleware, RequestFactory().get(RECIPES_URL))
+                for _ in range(20)
+            ]
+            for _ in range(3):
+                served.acquire()
+            rejected = [
+                future.result(5).status_code for future in futures[3:]
+            ]
+            release.set()
+            served = [future.result(5).status_code for future in futures[:3]]
+
+        self.assertEqual(rejected, [503] * 17)
+        self.assertEqual(served, [200] * 3)
+
+
+class AdmissionCheckTests(SimpleTestCase):
+
+    @override_settings(SERVER_THREADS=4, ADMISSION_MAX_CONCURRENCY=3,
+                       ADMISSION_MAX_QUEUE=1)
+    def test_no_thread_left_to_reject(self):
+        """Test a limit taking every server thread is reported"""
+        ids = [message.id for message in run_checks()]
+        self.assertIn("core.W001", ids)
+
+        with self.settings(ADMISSION_MAX_QUEUE=0):
+            ids = [message.id for message in run_checks()]
+        self.assertNotIn("core.W001", ids)
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }, "shared": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": "127.0.0.1:11211",
+    }}, THROTTLE_CACHE="default", LOGIN_FAILURE_CACHE="shared")
+    def test_limits_in_local_cache(self):
+        """Test limits kept in a per process cache are reported"""
+        messages = [m for m in run_checks() if m.id == "core.W002"]
+        self.assertEqual(len(messages), 1)
+        self.assertIn("THROTTLE_CACHE", messages[0].msg)
+
+        with self.settings(DEBUG=True):
+            ids = [message.id for message in run_checks()]
+        self.assertNotIn("core.W002", ids)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.ratelimit import TokenBucket
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Token bucket per user, or client address, and endpoint scope
+
+    The scope is the `throttle_scope` of the view, whose rate in
+    DEFAULT_THROTTLE_RATES, e.g. "600/min", gives the capacity of the
+    bucket and the period over which it refills. Every request takes the
+    tokens its action costs in the `throttle_costs` of the view, 1 by
+    default, so that expensive actions drain the bucket faster. Buckets
+    live in the THROTTLE_CACHE cache, shared by the processes when it is.
+    Views without a scope are not throttled.
+    """
+    scope_attr = "throttle_scope"
+
+    def __init__(self):
+        # the rate depends on the view, see allow_request
+        self.wait_time = None
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        bucket = TokenBucket(
+            "throttle", getattr(settings, "THROTTLE_CACHE", "default")
+        )
+        self.wait_time = bucket.consume(
+            self.get_cache_key(request, view),
+            capacity=self.num_requests,
+            rate=self.num_requests / self.duration,
+            cost=self.get_cost(request, view)
+        )
+        return self.wait_time is None
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user-{request.user.pk}"
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def get_cost(self, request, view):
+        """Return the tokens taken by the action of the request"""
+        action = getattr(view, "action", None) or request.method.lower()
+        return getattr(view, "throttle_costs", {}).get(action, 1)
+
+    def wait(self):
+        return self.wait_time
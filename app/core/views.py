@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core.metrics import registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@require_GET
+def metrics_view(request):
+    """Expose the metrics of this process in Prometheus text format
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`;
+    the endpoint does not exist while no token is configured.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        raise Http404
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    if not constant_time_compare(authorization, f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,35 @@
+"""Gunicorn settings of the production server
+
+Every value can be overridden from the environment. Send SIGHUP to the
+master to reload the workers gracefully, e.g. after a deploy.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# processes serving requests and threads per process; threads share the
+# process' database connections, caches and image workers
+workers = int(os.environ.get(
+    "GUNICORN_WORKERS",
+    multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# recycle workers after this many requests, spread out by the jitter so
+# they do not all restart at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# the application is loaded by each worker, so that a reload picks up new
+# code and no threads are running in the master when it forks
+preload_app = False
+
+# an empty GUNICORN_ACCESS_LOG turns the access log off
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        from recipe import signals  # noqa: F401
+        from core.metrics import registry
+        from recipe.metrics import cache_metrics
+        registry.register(cache_metrics)
@@ -0,0 +1,233 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+from core.models import CollectionVersion
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _keys(name):
+    """Return the whole name key and the keys of its later words"""
+    key = name.casefold()
+    words = [
+        key[match.start():] for match in WORD_RE.finditer(key)
+        if match.start() > 0
+    ]
+    return key, words
+
+
+def _scan(keys, prefix):
+    """Yield the ids of the sorted (key, id) pairs starting with prefix"""
+    position = bisect_left(keys, (prefix,))
+    while position < len(keys) and keys[position][0].startswith(prefix):
+        yield keys[position][1]
+        position += 1
+
+
+class PrefixIndex:
+    """Sorted arrays of the names of one user's tags or ingredients
+
+    Names are kept casefolded in a sorted list of (key, id) pairs, and so
+    are the suffixes of names starting at each later word, so that both
+    "Red onion" and "onion" find "Red onion" by binary search.
+    """
+
+    def __init__(self, items=()):
+        self.names = {}
+        self._names = []
+        self._words = []
+        for pk, name in items:
+            self.names[pk] = name
+            key, words = _keys(name)
+            self._names.append((key, pk))
+            self._words.extend((word, pk) for word in words)
+        self._names.sort()
+        self._words.sort()
+
+    def __len__(self):
+        return len(self._names) + len(self._words)
+
+    def add(self, pk, name):
+        """Index an item, replacing its previous name if any"""
+        self.remove(pk)
+        self.names[pk] = name
+        key, words = _keys(name)
+        insort(self._names, (key, pk))
+        for word in words:
+            insort(self._words, (word, pk))
+
+    def remove(self, pk):
+        """Drop an item from the index if it is there"""
+        name = self.names.pop(pk, None)
+        if name is None:
+            return
+        key, words = _keys(name)
+        self._delete(self._names, (key, pk))
+        for word in words:
+            self._delete(self._words, (word, pk))
+
+    def search(self, prefix, limit):
+        """Return up to limit (id, name) pairs matching the prefix
+
+        Items whose name starts with the prefix come first, in name
+        order, followed by those having a later word starting with it.
+        """
+        prefix = prefix.casefold()
+        found = {}
+        for keys in (self._names, self._words):
+            for pk in _scan(keys, prefix):
+                if len(found) == limit:
+                    break
+                found.setdefault(pk, self.names[pk])
+        return list(found.items())
+
+    def _delete(self, keys, entry):
+        position = bisect_left(keys, entry)
+        if position < len(keys) and keys[position] == entry:
+            del keys[position]
+
+
+class AutocompleteIndexes:
+    """Per-process LRU cache of prefix indexes by collection and user
+
+    Every index is tagged with the version stamp of the collection it was
+    built from. Lookups compare it with the current stamp and rebuild
+    stale indexes, so writes made by other processes or by bulk requests
+    are picked up; the item signals of this process update cached indexes
+    in place after their transaction commits. The cache holds at most
+    `max_keys` keys in total, evicting the least recently used indexes,
+    and users with more than `max_user_items` items are not indexed.
+    """
+
+    def __init__(self, max_keys, max_user_items):
+        self.max_keys = max_keys
+        self.max_user_items = max_user_items
+        self._indexes = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, queryset, user, version):
+        """Return the current index of the user's items, or None
+
+        None is returned for users with too many items to be indexed.
+        """
+        key = (queryset.model._meta.model_name, user.pk)
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None and cached[0] == version:
+                self._indexes.move_to_end(key)
+                return cached[1]
+
+        items = list(
+            queryset.filter(user=user).values_list("id", "name")
+            [:self.max_user_items + 1]
+        )
+        index = None
+        if len(items) <= self.max_user_items:
+            index = PrefixIndex(items)
+        with self._lock:
+            self._store(key, version, index)
+        return index
+
+    def cached(self, model, user_id):
+        """Return whether an index of the user's items is cached"""
+        with self._lock:
+            return (model._meta.model_name, user_id) in self._indexes
+
+    def update(self, model, user_id, version, pk, name=None):
+        """Apply the committed change that moved the collection to version
+
+        An index one version behind takes the change and an index at or
+        past it has it already. Any other index missed some change and is
+        dropped.
+        """
+        key = (model._meta.model_name, user_id)
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is None or cached[1] is None or cached[0] >= version:
+                return
+            cached_version, index = cached
+            if cached_version != version - 1:
+                self._discard(key)
+                return
+            self._size -= len(index)
+            if name is None:
+                index.remove(pk)
+            else:
+                index.add(pk, name)
+            self._size += len(index)
+            self._indexes[key] = (version, index)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return the number of cached indexes and of their keys"""
+        with self._lock:
+            return {"indexes": len(self._indexes), "keys": self._size}
+
+    def _store(self, key, version, index):
+        self._discard(key)
+        self._indexes[key] = (version, index)
+        self._size += len(index or ())
+        while self._size > self.max_keys and len(self._indexes) > 1:
+            self._discard(next(iter(self._indexes)))
+
+    def _discard(self, key):
+        cached = self._indexes.pop(key, None)
+        if cached is not None:
+            self._size -= len(cached[1] or ())
+
+
+indexes = AutocompleteIndexes(
+    max_keys=getattr(settings, "AUTOCOMPLETE_MAX_KEYS", 500000),
+    max_user_items=getattr(settings, "AUTOCOMPLETE_MAX_USER_ITEMS", 20000),
+)
+
+
+def search_queryset(queryset, prefix, limit):
+    """Return (id, name) pairs matching the prefix from the database
+
+    Used for users whose items are not indexed in memory. The regular
+    expressions are served by the pg_trgm indexes on the names where the
+    extension is installed.
+    """
+    pattern = re.escape(prefix)
+    starts = Case(
+        When(name__iregex="^" + pattern, then=Value(0)),
+        default=Value(1),
+        output_field=IntegerField()
+    )
+    return list(
+        queryset.filter(name__iregex=r"\m" + pattern)
+        .annotate(starts=starts)
+        .order_by("starts", Lower("name"), "id")
+        .values_list("id", "name")[:limit]
+    )
+
+
+def item_changed(model, user_id, pk, name=None):
+    """Update the cached index of an item once the change is committed
+
+    Called after the collection version was bumped for the change, whose
+    row lock makes the version read here the one of this change.
+    """
+    if not indexes.cached(model, user_id):
+        return
+    version = CollectionVersion.objects.filter(
+        user_id=user_id,
+        collection=model._meta.model_name
+    ).values_list("version", flat=True).first()
+    if version is not None:
+        transaction.on_commit(
+            lambda: indexes.update(model, user_id, version, pk, name)
+        )
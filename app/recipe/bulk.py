@@ -0,0 +1,258 @@
+from contextlib import contextmanager
+
+from django.db import connection, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+
+
+@contextmanager
+def atomic_bulk_write():
+    """Run a bulk write in a transaction, reporting conflicts as a 400"""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError:
+        raise ValidationError({"non_field_errors": [
+            _("The items conflict with existing data.")
+        ]})
+
+
+class BulkModelMixin:
+    """Create, update and delete many objects in one request
+
+    POST, PATCH and DELETE on ``<list url>/bulk/`` take a list of at most
+    ``bulk_max_items`` items. Every item is validated first, then the valid
+    ones are written in a single transaction with bulk queries, including
+    the rows of the many-to-many through tables. The response reports an
+    outcome for every item in request order.
+    """
+    bulk_max_items = 500
+
+    @action(methods=["POST", "PATCH", "DELETE"], detail=False,
+            url_path="bulk")
+    def bulk(self, request):
+        """Dispatch a bulk request on its HTTP method"""
+        items = self.get_bulk_items(request.data)
+        if request.method == "POST":
+            results = self.bulk_create(items)
+        elif request.method == "PATCH":
+            results = self.bulk_update(items)
+        else:
+            results = self.bulk_destroy(items)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    def get_bulk_items(self, data):
+        """Return the submitted list of items, validating its size"""
+        if not isinstance(data, list):
+            raise ValidationError(
+                {"non_field_errors": [_("Expected a list of items.")]}
+            )
+        if len(data) > self.bulk_max_items:
+            raise ValidationError({"non_field_errors": [
+                _("Expected at most {max_items} items.").format(
+                    max_items=self.bulk_max_items
+                )
+            ]})
+        return data
+
+    def get_bulk_save_kwargs(self):
+        """Return attributes set on every created object"""
+        return {}
+
+    def validate_bulk(self, entries, instances=None):
+        """Validate the valid items together
+
+        `entries` maps item indexes to validated data and `instances` maps
+        them to the objects being updated, if any. Return a dict mapping
+        the indexes of rejected items to their errors.
+        """
+        return {}
+
+    def bulk_written(self, instances, created):
+        """Hook called in the write transaction with the written objects
+
+        Bulk writes send no model signals, so work done by receivers for
+        single objects has to be repeated here.
+        """
+
+    def bulk_create(self, items):
+        """Validate and insert new objects"""
+        results = [None] * len(items)
+        entries = {}
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                entries[index] = serializer.validated_data
+            else:
+                results[index] = self._failure(serializer.errors)
+        self._reject(entries, self.validate_bulk(entries), results)
+
+        model = self.get_queryset().model
+        m2m_names = [field.name for field in model._meta.many_to_many]
+        instances = {}
+        relations = {}
+        for index, data in entries.items():
+            data = dict(data)
+            relations[index] = {
+                name: data.pop(name) for name in m2m_names if name in data
+            }
+            instances[index] = model(**data, **self.get_bulk_save_kwargs())
+
+        with atomic_bulk_write():
+            self._bulk_insert(model, list(instances.values()))
+            self._bulk_set_relations(model, instances, relations)
+            self.bulk_written(list(instances.values()), created=True)
+            self._bump_version(model)
+
+        for index, instance in instances.items():
+            results[index] = {
+                "status": status.HTTP_201_CREATED,
+                "id": instance.pk
+            }
+        return results
+
+    def bulk_update(self, items):
+        """Validate and partially update existing objects"""
+        results = [None] * len(items)
+        ids = {}
+        for index, item in enumerate(items):
+            pk = item.get("id") if isinstance(item, dict) else None
+            if isinstance(pk, int) and not isinstance(pk, bool):
+                ids[index] = pk
+            else:
+                results[index] = self._failure(
+                    {"id": [_("Expected an integer id.")]}
+                )
+        found = self.get_queryset().in_bulk(set(ids.values()))
+
+        entries = {}
+        instances = {}
+        for index, pk in ids.items():
+            instance = found.get(pk)
+            if instance is None:
+                results[index] = self._missing()
+                continue
+            serializer = self.get_serializer(
+                instance, data=items[index], partial=True
+            )
+            if serializer.is_valid():
+                entries[index] = serializer.validated_data
+                instances[index] = instance
+            else:
+                results[index] = self._failure(serializer.errors)
+        self._reject(
+            entries, self.validate_bulk(entries, instances), results
+        )
+
+        model = self.get_queryset().model
+        m2m_names = [field.name for field in model._meta.many_to_many]
+        fields = set()
+        relations = {}
+        for index, data in entries.items():
+            relations[index] = {}
+            for name, value in data.items():
+                if name in m2m_names:
+                    relations[index][name] = value
+                else:
+                    setattr(instances[index], name, value)
+                    fields.add(name)
+
+        updated = {index: instances[index] for index in entries}
+        if fields:
+            # bulk_update() does not refresh auto_now fields by itself
+            now = timezone.now()
+            for field in model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for instance in updated.values():
+                        setattr(instance, field.attname, now)
+                    fields.add(field.name)
+        with atomic_bulk_write():
+            if fields:
+                model.objects.bulk_update(updated.values(), sorted(fields))
+            self._bulk_set_relations(model, updated, relations, clear=True)
+            self.bulk_written(list(updated.values()), created=False)
+            self._bump_version(model)
+
+        for index, instance in updated.items():
+            results[index] = {"status": status.HTTP_200_OK, "id": instance.pk}
+        return results
+
+    def bulk_destroy(self, items):
+        """Delete existing objects given as a list of ids"""
+        results = [None] * len(items)
+        ids = {}
+        for index, pk in enumerate(items):
+            if isinstance(pk, int) and not isinstance(pk, bool):
+                ids[index] = pk
+            else:
+                results[index] = self._failure(
+                    {"id": [_("Expected an integer id.")]}
+                )
+        queryset = self.get_queryset().filter(pk__in=set(ids.values()))
+        with transaction.atomic():
+            found = set(queryset.values_list("pk", flat=True))
+            queryset.delete()
+
+        for index, pk in ids.items():
+            if pk in found:
+                results[index] = {
+                    "status": status.HTTP_204_NO_CONTENT,
+                    "id": pk
+                }
+            else:
+                results[index] = self._missing()
+        return results
+
+    def _bulk_insert(self, model, objs):
+        """Insert objects, making sure their primary keys are set"""
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(objs)
+        else:
+            for obj in objs:
+                obj.save()
+
+    def _bulk_set_relations(self, model, instances, relations, clear=False):
+        """Write the many-to-many rows of every instance in bulk"""
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = field.m2m_field_name() + "_id"
+            target = field.m2m_reverse_field_name() + "_id"
+            changed = [
+                index for index in instances
+                if field.name in relations.get(index, {})
+            ]
+            if clear and changed:
+                through.objects.filter(**{
+                    f"{source}__in": [instances[i].pk for i in changed]
+                }).delete()
+            through.objects.bulk_create([
+                through(**{source: instances[index].pk, target: related.pk})
+                for index in changed
+                for related in relations[index][field.name]
+            ])
+
+    def _bump_version(self, model):
+        """Record the change, as bulk writes do not send model signals"""
+        CollectionVersion.objects.bump(
+            self.request.user.pk,
+            model._meta.model_name
+        )
+
+    def _reject(self, entries, errors, results):
+        for index, error in errors.items():
+            entries.pop(index, None)
+            results[index] = self._failure(error)
+
+    def _failure(self, errors):
+        return {"status": status.HTTP_400_BAD_REQUEST, "errors": errors}
+
+    def _missing(self):
+        return {"status": status.HTTP_404_NOT_FOUND, "errors": {
+            "id": [_("Not found.")]
+        }}
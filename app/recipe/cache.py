@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+class ResponseCache:
+    """Cache of response data guarded against stampedes
+
+    On a miss only the caller that takes the key's lock computes the
+    value; the others wait for it to appear for up to `wait_timeout`
+    seconds before computing it themselves. Hits, misses and waits are
+    counted per process.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, alias, timeout, lock_timeout, wait_timeout):
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self._counters = {"hits": 0, "misses": 0, "waits": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_or_set(self, key, compute):
+        """Return (value, hit) for key, calling compute on a miss"""
+        value = self.cache.get(key)
+        if value is not None:
+            self._count("hits")
+            return value, True
+
+        lock_key = key + ":lock"
+        locked = self.cache.add(lock_key, 1, self.lock_timeout)
+        if not locked:
+            self._count("waits")
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                value = self.cache.get(key)
+                if value is not None:
+                    self._count("hits")
+                    return value, True
+
+        self._count("misses")
+        try:
+            value = compute()
+            if value is not None:
+                self.cache.set(key, value, self.timeout)
+        finally:
+            if locked:
+                self.cache.delete(lock_key)
+        return value, False
+
+    def stats(self):
+        """Return a copy of the hit/miss/wait counters of this process"""
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+response_cache = ResponseCache(
+    alias=getattr(settings, "RESPONSE_CACHE_ALIAS", "default"),
+    timeout=getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300),
+    lock_timeout=getattr(settings, "RESPONSE_CACHE_LOCK_TIMEOUT", 10),
+    wait_timeout=getattr(settings, "RESPONSE_CACHE_WAIT_TIMEOUT", 2),
+)
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve responses from the per-user cache
+
+    Entries are keyed by user, action, object, normalized query params
+    (which include the page cursor) and the version stamps of
+    ConditionalGetMixin. The post_save, post_delete and m2m_changed
+    signals of Recipe, Tag and Ingredient bump those stamps, so every
+    write moves readers to new keys and old entries are left to expire.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self):
+        """Return the cache key of the requested response"""
+        versions, _ = self.get_version_stamp()
+        params = sorted(
+            (key, values) for key, values in self.request.query_params.lists()
+        )
+        key = "|".join([
+            self.request.get_host(),
+            self.basename or self.__class__.__name__,
+            str(self.request.user.pk),
+            str(self.action),
+            repr(sorted(self.kwargs.items())),
+            repr(params),
+            repr(versions),
+        ])
+        return "response:" + hashlib.md5(key.encode()).hexdigest()
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """Return the cached data of the view, computing it on a miss"""
+        computed = []
+
+        def compute():
+            response = view(request, *args, **kwargs)
+            computed.append(response)
+            return response.data if response.status_code == 200 else None
+
+        data, hit = response_cache.get_or_set(self.get_cache_key(), compute)
+        response = computed[0] if computed else Response(data)
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from core.models import CollectionVersion
+
+
+class ConditionalGetMixin:
+    """Answer conditional list and retrieve requests from version stamps
+
+    The ETag and Last-Modified of a response are derived from the version
+    stamps of the user's collections listed in `version_collections`,
+    which every change to those collections bumps. A request carrying a
+    matching If-None-Match or If-Modified-Since is answered with a 304
+    after a single stamp lookup, without querying or serializing items.
+    """
+    version_collections = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_version_stamp(self):
+        """Return the versions and last change time of the collections"""
+        if not hasattr(self, "_version_stamp"):
+            self._version_stamp = CollectionVersion.objects.stamp(
+                self.request.user,
+                self.version_collections
+            )
+        return self._version_stamp
+
+    def get_etag(self, versions):
+        """Return the ETag of the requested representation"""
+        key = "|".join([
+            str(self.request.user.pk),
+            repr(versions),
+            self.request.get_full_path(),
+            self.request.META.get("HTTP_ACCEPT", ""),
+        ])
+        return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+    def conditional_response(self, view, request, *args, **kwargs):
+        """Return a 304 if the client copy is current, else call view"""
+        versions, updated_at = self.get_version_stamp()
+        etag = self.get_etag(versions)
+        last_modified = int(updated_at.timestamp())
+
+        response = get_conditional_response(
+            request._request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe
+
+EXPORT_FIELDS = ("id", "title", "time_minutes", "price", "link", "tags",
+                 "ingredients")
+
+
+def _related_names(through, field, recipe_ids):
+    """Return the related names of every recipe id in one query"""
+    names = {}
+    rows = through.objects.filter(recipe_id__in=recipe_ids) \
+        .values_list("recipe_id", f"{field}__name") \
+        .order_by("recipe_id", f"{field}__name")
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def export_rows(queryset, chunk_size):
+    """Yield a dict for every recipe of the queryset, in id order
+
+    Recipes are read in keyset batches of chunk_size rows, each followed
+    by one query per relation for the tag and ingredient names of the
+    batch, so that memory does not grow with the size of the catalogue.
+    """
+    columns = ("id", "title", "time_minutes", "price", "link")
+    last_id = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_id).order_by("pk")
+            .values_list(*columns)[:chunk_size]
+        )
+        if not batch:
+            return
+        ids = [row[0] for row in batch]
+        tags = _related_names(Recipe.tags.through, "tag", ids)
+        ingredients = _related_names(
+            Recipe.ingredients.through, "ingredient", ids
+        )
+        for row in batch:
+            recipe = dict(zip(columns, row))
+            recipe["price"] = str(recipe["price"])
+            recipe["tags"] = tags.get(recipe["id"], [])
+            recipe["ingredients"] = ingredients.get(recipe["id"], [])
+            yield recipe
+        last_id = ids[-1]
+
+
+def ndjson_lines(rows):
+    """Yield every row as a line of JSON"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows):
+    """Yield a header line then a CSV line for every row
+
+    Tag and ingredient names are written as JSON arrays, so that names
+    containing any separator survive a round trip.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(EXPORT_FIELDS)
+    for row in rows:
+        yield line([
+            json.dumps(row[field], ensure_ascii=False)
+            if field in ("tags", "ingredients") else row[field]
+            for field in EXPORT_FIELDS
+        ])
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Negotiates NDJSON exports, which are streamed without rendering
+
+    Only error responses of the export are rendered, as JSON.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class CSVRenderer(NDJSONRenderer):
+    """Negotiates CSV exports"""
+    media_type = "text/csv"
+    format = "csv"
+
+
+FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv; charset=utf-8"),
+}
+
+
+def export_response(queryset, output):
+    """Stream the recipes of the queryset in the given format"""
+    lines, content_type = FORMATS[output]
+    chunk_size = getattr(settings, "RECIPE_EXPORT_CHUNK_SIZE", 2000)
+    response = StreamingHttpResponse(
+        lines(export_rows(queryset, chunk_size)),
+        content_type=content_type
+    )
+    response["Content-Disposition"] = \
+        f'attachment; filename="recipes.{output}"'
+    response["Cache-Control"] = "private, no-store"
+    return response
@@ -0,0 +1,91 @@
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+class RecipeFilter:
+    """Filter recipes by their related tags and ingredients
+
+    Every dimension takes a comma separated list of ids (``?tags=1,2``) and
+    a match mode (``?tags_match=all``). ``any`` keeps recipes related to at
+    least one of the ids and ``all`` keeps recipes related to every one of
+    them. Both modes are subqueries on the through table, so the recipe
+    rows are never joined to their relations and never duplicated.
+    """
+    MATCH_ANY = "any"
+    MATCH_ALL = "all"
+    match_suffix = "_match"
+    max_ids = 100
+
+    dimensions = {
+        "tags": (Recipe.tags.through, "tag_id"),
+        "ingredients": (Recipe.ingredients.through, "ingredient_id"),
+    }
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    def filter_queryset(self, queryset):
+        """Apply every requested dimension, raising on invalid input"""
+        errors = {}
+        conditions = []
+        for param, (through, column) in self.dimensions.items():
+            try:
+                ids = self.parse_ids(param)
+                match = self.parse_match(param)
+            except ValidationError as exc:
+                errors.update(exc.detail)
+                continue
+            if ids:
+                conditions.append(self.condition(through, column, ids, match))
+
+        if errors:
+            raise ValidationError(errors)
+        for condition in conditions:
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def parse_ids(self, param):
+        """Convert a comma separated list of ids to a set of integers"""
+        value = self.query_params.get(param, "").strip()
+        if not value:
+            return set()
+        try:
+            ids = {int(str_id) for str_id in value.split(",")}
+        except ValueError:
+            raise ValidationError(
+                {param: [_("Expected a comma separated list of ids.")]}
+            )
+        if len(ids) > self.max_ids or any(pk <= 0 for pk in ids):
+            raise ValidationError({param: [
+                _("Expected at most {max_ids} positive ids.").format(
+                    max_ids=self.max_ids
+                )
+            ]})
+        return ids
+
+    def parse_match(self, param):
+        """Return the match mode requested for a dimension"""
+        name = param + self.match_suffix
+        match = self.query_params.get(name, self.MATCH_ANY)
+        if match not in (self.MATCH_ANY, self.MATCH_ALL):
+            raise ValidationError({name: [
+                _("Expected '{any}' or '{all}'.").format(
+                    any=self.MATCH_ANY, all=self.MATCH_ALL
+                )
+            ]})
+        return match
+
+    def condition(self, through, column, ids, match):
+        """Return the filter expression for a single dimension"""
+        rows = through.objects.filter(**{f"{column}__in": ids})
+        if match == self.MATCH_ANY:
+            return Exists(rows.filter(recipe_id=OuterRef("pk")))
+
+        matching = rows.values("recipe_id") \
+            .annotate(matched=Count(column)) \
+            .filter(matched=len(ids)) \
+            .values("recipe_id")
+        return Q(pk__in=matching)
@@ -0,0 +1,148 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import CollectionVersion, Recipe
+
+logger = logging.getLogger(__name__)
+
+# field, bounding box and format of every variant generated for an upload
+VARIANTS = (
+    ("image_thumbnail", (150, 150), "JPEG"),
+    ("image_medium", (600, 600), "JPEG"),
+    ("image_webp", (1200, 1200), "WEBP"),
+)
+
+VARIANT_FIELDS = tuple(field for field, _, _ in VARIANTS)
+
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+_executor = None
+
+
+def get_executor():
+    """Return the process wide pool of image workers"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix="recipe-images"
+        )
+    return _executor
+
+
+def schedule(recipe_id):
+    """Process a recipe image in the background once the upload commits
+
+    With IMAGE_PROCESSING_WORKERS set to 0 the image is processed inline,
+    which is what the tests rely on.
+    """
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        process(recipe_id)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_in_worker, recipe_id)
+    )
+
+
+def _run_in_worker(recipe_id):
+    try:
+        process(recipe_id)
+    except Exception:
+        logger.exception("Processing image of recipe %s failed", recipe_id)
+        _mark_failed(recipe_id)
+    finally:
+        connection.close()
+
+
+def _mark_failed(recipe_id):
+    """Fail an image left unprocessed, so that it can be uploaded again"""
+    try:
+        _set_status(
+            recipe_id, Recipe.IMAGE_FAILED,
+            image_status__in=(Recipe.IMAGE_PENDING, Recipe.IMAGE_PROCESSING)
+        )
+    except Exception:
+        logger.exception("Recipe %s image can not be marked failed",
+                         recipe_id)
+
+
+def process(recipe_id):
+    """Strip the metadata of a recipe image and generate its variants"""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    _set_status(recipe_id, Recipe.IMAGE_PROCESSING, image=source)
+
+    try:
+        with recipe.image.open("rb") as image_file:
+            image = Image.open(image_file)
+            image_format = image.format
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        files = {"image": _encode(image, image_format)}
+        for field, size, variant_format in VARIANTS:
+            variant = image.copy()
+            variant.thumbnail(size, Image.LANCZOS)
+            files[field] = _encode(variant, variant_format)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Recipe %s image can not be decoded", recipe_id)
+        _finish(recipe_id, source, {}, Recipe.IMAGE_FAILED)
+        return
+
+    _finish(recipe_id, source, files, Recipe.IMAGE_READY)
+
+
+def _set_status(recipe_id, status, **filters):
+    """Set the image status of a recipe matching the filters
+
+    The update sends no signals, so the recipe collection of the owner is
+    bumped here for cached responses and ETags to pick up the change.
+    """
+    with transaction.atomic():
+        recipes = Recipe.objects.select_for_update() \
+            .filter(pk=recipe_id, **filters)
+        user_id = recipes.values_list("user_id", flat=True).first()
+        if user_id is None:
+            return
+        recipes.update(image_status=status, updated_at=timezone.now())
+        CollectionVersion.objects.bump(user_id, "recipe")
+
+
+def _encode(image, image_format):
+    """Encode an image without any of its metadata"""
+    if image_format not in EXTENSIONS:
+        image_format = "PNG"
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    data = io.BytesIO()
+    image.save(data, format=image_format, quality=85, optimize=True)
+    return image_format, data.getvalue()
+
+
+def _finish(recipe_id, source, files, status):
+    """Store the processed files unless the image was replaced meanwhile"""
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update() \
+            .filter(pk=recipe_id, image=source).first()
+        if recipe is None:
+            return
+        # replaced files are left to collect_image_blobs, as other
+        # recipes may share them
+        for field, (image_format, data) in files.items():
+            getattr(recipe, field).save(
+                f"{field}.{EXTENSIONS[image_format]}",
+                ContentFile(data),
+                save=False
+            )
+        recipe.image_status = status
+        recipe.save(
+            update_fields=["image_status", *files.keys(), "updated_at"]
+        )
@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+from core.models import CollectionVersion, Tag, Ingredient, Recipe
+from recipe.serializers import RecipeImportSerializer
+
+RELATIONS = (("tags", Tag), ("ingredients", Ingredient))
+
+
+def read_ndjson(lines):
+    """Yield (line number, data, error) for every line of JSON"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError:
+            yield number, None, {"non_field_errors": [_("Invalid JSON.")]}
+
+
+def read_csv(lines):
+    """Yield (line number, data, error) for every row after the header
+
+    Tag and ingredient cells hold JSON arrays of names, as written by the
+    export, and may be left empty.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        errors = {}
+        for field, _model in RELATIONS:
+            cell = (row.get(field) or "").strip()
+            try:
+                row[field] = json.loads(cell) if cell else []
+            except ValueError:
+                errors[field] = [_("Expected a JSON array of names.")]
+        yield reader.line_num, row, errors or None
+
+
+READERS = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+def decode_lines(chunks):
+    """Decode an iterable of UTF-8 byte lines, dropping a leading BOM"""
+    for index, line in enumerate(chunks):
+        line = line.decode("utf-8")
+        yield line.lstrip("\ufeff") if index == 0 else line
+
+
+class NameCache:
+    """Ids of a user's tags or ingredients by name
+
+    Names are resolved in batches: unknown ones are looked up with one
+    query, and those still missing are created with one bulk insert.
+    """
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = {}
+        self.created = 0
+
+    def resolve(self, names):
+        """Make sure every name has an id, creating the missing items"""
+        missing = set(names) - self.ids.keys()
+        if not missing:
+            return
+        self._load(missing)
+        missing -= self.ids.keys()
+        if missing:
+            self.model.objects.bulk_create(
+                [self.model(user=self.user, name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            self._load(missing)
+            self.created += len(missing)
+
+    def _load(self, names):
+        self.ids.update(
+            self.model.objects.filter(user=self.user, name__in=names)
+            .values_list("name", "id")
+        )
+
+
+class RecipeImporter:
+    """Insert the recipe records of an import in committed chunks
+
+    Every chunk of valid records is written in one transaction with bulk
+    inserts of the recipes and of their through rows, after resolving the
+    tag and ingredient names it uses. Invalid records are skipped and
+    reported. `position` counts the records read, committed or skipped,
+    so that an interrupted import is resumed by passing it as `start`.
+    `on_chunk` is called with the report after every commit.
+    """
+    max_errors = 100
+
+    def __init__(self, user, chunk_size=None, start=0, on_chunk=None):
+        self.user = user
+        self.chunk_size = chunk_size or getattr(
+            settings, "RECIPE_IMPORT_CHUNK_SIZE", 1000
+        )
+        self.start = start
+        self.on_chunk = on_chunk
+        self.names = {field: NameCache(model, user)
+                      for field, model in RELATIONS}
+        self.position = start
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self._started = None
+
+    def run(self, records):
+        """Import the (line number, data, error) records of a reader"""
+        self._started = time.perf_counter()
+        # one serializer validates every record, building its fields once
+        serializer = RecipeImportSerializer()
+        chunk = []
+        read = self.start
+        for index, (line, data, error) in enumerate(records):
+            if index < self.start:
+                continue
+            read = index + 1
+            if error is None:
+                try:
+                    chunk.append(serializer.run_validation(data))
+                except ValidationError as exc:
+                    error = exc.detail
+                else:
+                    if len(chunk) == self.chunk_size:
+                        self._write(chunk, read)
+                        chunk = []
+                    continue
+            self._fail(line, error)
+        if chunk:
+            self._write(chunk, read)
+        self.position = read
+        return self.report()
+
+    def report(self):
+        """Return the counters and the throughput of the import"""
+        elapsed = time.perf_counter() - self._started if self._started \
+            else 0.0
+        read = self.position - self.start
+        return {
+            "position": self.position,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "elapsed": round(elapsed, 3),
+            "records_per_second": round(read / elapsed, 1) if elapsed else 0,
+        }
+
+    def _fail(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "errors": errors})
+
+    def _write(self, chunk, position):
+        with transaction.atomic():
+            created = {}
+            for field, _model in RELATIONS:
+                cache = self.names[field]
+                before = cache.created
+                cache.resolve(
+                    name for data in chunk for name in data[field]
+                )
+                created[field] = cache.created > before
+
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=self.user,
+                    **{key: value for key, value in data.items()
+                       if key not in self.names}
+                )
+                for data in chunk
+            ])
+            for field, _model in RELATIONS:
+                ids = self.names[field].ids
+                self._copy_relations(field, [
+                    (recipe.pk, ids[name])
+                    for recipe, data in zip(recipes, chunk)
+                    for name in dict.fromkeys(data[field])
+                ])
+            Recipe.objects.filter(pk__in=[r.pk for r in recipes]) \
+                .update_related()
+
+            collections = [Recipe._meta.model_name] + [
+                model._meta.model_name for field, model in RELATIONS
+                if created[field]
+            ]
+            CollectionVersion.objects.bump(self.user.pk, *collections)
+
+        self.created += len(recipes)
+        self.position = position
+        if self.on_chunk is not None:
+            self.on_chunk(self.report())
+
+    def _copy_relations(self, field, rows):
+        """Insert the (recipe id, item id) rows of a relation with COPY"""
+        field = Recipe._meta.get_field(field)
+        through = field.remote_field.through._meta
+        columns = [
+            through.get_field(name).column for name in
+            (field.m2m_field_name(), field.m2m_reverse_field_name())
+        ]
+        data = io.StringIO("".join(f"{a}\t{b}\n" for a, b in rows))
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                'COPY "{}" ("{}", "{}") FROM STDIN'.format(
+                    through.db_table, *columns
+                ),
+                data
+            )
@@ -0,0 +1,56 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.bench import WORDS, measure
+from core.models import Ingredient
+from recipe.autocomplete import indexes
+from recipe.views import IngredientViewSet
+
+
+class Command(BaseCommand):
+    """Benchmark ingredient autocomplete from memory and the database"""
+    help = "Time the autocomplete action over a user's seeded ingredients"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ingredients", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=1000)
+        parser.add_argument("--email", default="bench@ryszyydev.com")
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            email=options["email"]
+        )
+        Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=f"{WORDS[i % len(WORDS)]} {i}")
+            for i in range(options["ingredients"])
+        ], batch_size=5000, ignore_conflicts=True)
+        count = Ingredient.objects.filter(user=user).count()
+
+        rng = random.Random(0)
+        prefixes = [
+            word[:rng.randint(1, len(word))] for word in WORDS
+        ] + ["1", "42", "tom", "red"]
+        view = IngredientViewSet.as_view({"get": "autocomplete"})
+        factory = APIRequestFactory()
+
+        def complete():
+            request = factory.get("/", {"prefix": rng.choice(prefixes)})
+            force_authenticate(request, user)
+            response = view(request)
+            assert response.status_code == 200, response.status_code
+
+        max_user_items = indexes.max_user_items
+        for name, limit in (("index", count), ("database", 0)):
+            indexes.clear()
+            indexes.max_user_items = limit
+            first = measure(complete, 1)
+            stats = measure(complete, options["repeat"])
+            self.stdout.write(
+                f"{name:<9} items={count:<7} first={first['max']:.2f}ms "
+                f"p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms "
+                f"p99={stats['p99']:.2f}ms max={stats['max']:.2f}ms"
+            )
+        indexes.max_user_items = max_user_items
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.bench import seed_catalogue, measure
+from core.models import Tag, Ingredient, Recipe
+from recipe.filters import RecipeFilter
+
+
+class Command(BaseCommand):
+    """Benchmark recipe tag/ingredient filtering on a synthetic catalogue"""
+    help = "Time and EXPLAIN the recipe filters over a seeded catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--tags", type=int, default=50)
+        parser.add_argument("--ingredients", type=int, default=200)
+        parser.add_argument("--fanout", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--email", default="bench@ryszyydev.com")
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Print EXPLAIN ANALYZE output for every scenario"
+        )
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            email=options["email"]
+        )
+        missing = options["recipes"] - Recipe.objects.filter(user=user).count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing} recipes...")
+            seed_catalogue(
+                user,
+                missing,
+                tags=options["tags"],
+                ingredients=options["ingredients"],
+                fanout=options["fanout"],
+            )
+
+        tags = self._ids(Tag, user, 3)
+        ingredients = self._ids(Ingredient, user, 2)
+        recipes = Recipe.objects.filter(user=user)
+        scenarios = [
+            ("legacy joins", recipes
+                .filter(tags__id__in=tags.split(","))
+                .filter(ingredients__id__in=ingredients.split(","))),
+            ("tags any", {"tags": tags}),
+            ("tags all", {"tags": tags, "tags_match": "all"}),
+            ("ingredients any", {"ingredients": ingredients}),
+            ("tags any + ingredients any",
+                {"tags": tags, "ingredients": ingredients}),
+            ("tags all + ingredients all", {
+                "tags": tags, "tags_match": "all",
+                "ingredients": ingredients, "ingredients_match": "all"
+            }),
+        ]
+
+        page_size = options["page_size"]
+        for name, queryset in scenarios:
+            if isinstance(queryset, dict):
+                queryset = RecipeFilter(queryset).filter_queryset(recipes)
+            queryset = queryset.order_by("id")
+            stats = measure(
+                lambda: list(queryset[:page_size]),
+                options["repeat"]
+            )
+            rows = queryset.count()
+            distinct = queryset.values("id").distinct().count()
+            self.stdout.write(
+                f"{name:<28} rows={rows:<8} distinct={distinct:<8} "
+                f"p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms "
+                f"max={stats['max']:.2f}ms"
+            )
+            if options["explain"]:
+                self.stdout.write(queryset.explain(analyze=True))
+
+    def _ids(self, model, user, count):
+        """Return the first ids of a user's items as a query parameter"""
+        ids = model.objects.filter(user=user).order_by("id") \
+            .values_list("id", flat=True)[:count]
+        return ",".join(map(str, ids))
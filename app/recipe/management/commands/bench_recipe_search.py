@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.bench import seed_catalogue, measure
+from core.models import Recipe
+from recipe.search import RecipeSearch, trigram_available
+
+
+class Command(BaseCommand):
+    """Benchmark recipe full-text search on a synthetic catalogue"""
+    help = "Time and EXPLAIN ?q= searches against icontains scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000000)
+        parser.add_argument("--tags", type=int, default=50)
+        parser.add_argument("--ingredients", type=int, default=200)
+        parser.add_argument("--fanout", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--email", default="bench@ryszyydev.com")
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Print EXPLAIN ANALYZE output for every scenario"
+        )
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            email=options["email"]
+        )
+        missing = options["recipes"] - Recipe.objects.filter(user=user).count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing} recipes...")
+            seed_catalogue(
+                user,
+                missing,
+                tags=options["tags"],
+                ingredients=options["ingredients"],
+                fanout=options["fanout"],
+            )
+
+        recipes = Recipe.objects.filter(user=user)
+        scenarios = [
+            ("icontains title", recipes
+                .filter(title__icontains="tomato").order_by("id")),
+            ("icontains title+ingredients", recipes
+                .filter(Q(title__icontains="tomato")
+                        | Q(ingredients__name__icontains="tomato"))
+                .distinct().order_by("id")),
+            ("q=tomato", {"q": "tomato"}),
+            ("q=tom (prefix)", {"q": "tom"}),
+            ("q=tomato soup", {"q": "tomato soup"}),
+            ("q=leek 7", {"q": "leek 7"}),
+        ]
+        if trigram_available():
+            scenarios.append(("q=tomatoe (typo)", {"q": "tomatoe"}))
+        else:
+            self.stdout.write("pg_trgm is not installed, skipping typos")
+
+        page_size = options["page_size"]
+        for name, queryset in scenarios:
+            if isinstance(queryset, dict):
+                queryset = RecipeSearch(queryset).filter_queryset(recipes) \
+                    .order_by("-rank", "id")
+            stats = measure(
+                lambda: list(queryset[:page_size]),
+                options["repeat"]
+            )
+            rows = queryset.count()
+            self.stdout.write(
+                f"{name:<28} rows={rows:<8} "
+                f"p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms "
+                f"max={stats['max']:.2f}ms"
+            )
+            if options["explain"]:
+                self.stdout.write(queryset.explain(analyze=True))
@@ -0,0 +1,83 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import READERS, RecipeImporter
+
+
+class Command(BaseCommand):
+    """Import recipes of a user from an NDJSON or CSV file"""
+    help = "Stream recipes from a file into a user's catalogue, committing " \
+           "in chunks and recording a checkpoint to resume from"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--email", required=True)
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Defaults to csv for .csv files and ndjson otherwise"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Records per transaction, RECIPE_IMPORT_CHUNK_SIZE by default"
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording the position of the last committed "
+                 "record; an existing checkpoint resumes the import"
+        )
+        parser.add_argument(
+            "--start",
+            type=int,
+            default=0,
+            help="Number of leading records to skip"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        file_format = options["format"] or (
+            "csv" if options["path"].lower().endswith(".csv") else "ndjson"
+        )
+        checkpoint = options["checkpoint"]
+        start = options["start"]
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                start = json.load(f)["position"]
+            self.stdout.write(f"Resuming after record {start}")
+
+        def save_checkpoint(report):
+            if checkpoint:
+                with open(checkpoint + ".tmp", "w") as f:
+                    json.dump({"position": report["position"]}, f)
+                os.replace(checkpoint + ".tmp", checkpoint)
+
+        def on_chunk(report):
+            save_checkpoint(report)
+            self.stdout.write(
+                "{position} records, {created} created, {failed} failed, "
+                "{records_per_second:.0f} records/s".format(**report)
+            )
+
+        importer = RecipeImporter(
+            user,
+            chunk_size=options["chunk_size"],
+            start=start,
+            on_chunk=on_chunk
+        )
+        with open(options["path"], encoding="utf-8-sig", newline="") as f:
+            report = importer.run(READERS[file_format](f))
+
+        for error in report["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        save_checkpoint(report)
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {created} recipes, {failed} failed, in {elapsed:.1f}s "
+            "({records_per_second:.0f} records/s)".format(**report)
+        ))
@@ -0,0 +1,138 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# stored names never change content, see core.storage
+MEDIA_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class FileRange:
+    """File object limited to `length` bytes starting at `start`
+
+    It keeps fileno(), so that WSGI servers supporting wsgi.file_wrapper
+    can still send the range with sendfile() from the current offset.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the (start, end) of a single byte range header
+
+    None means the whole file should be sent and ValueError that the range
+    can not be satisfied. Several ranges are answered with the whole file.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def file_etag(name, stat):
+    """Return a strong ETag, the digest for content addressed names"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if re.fullmatch(r"[0-9a-f]{64}", stem):
+        return f'"{stem}"'
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def serve_file(request, name, path):
+    """Answer a request for a stored media file
+
+    With MEDIA_SENDFILE_HEADER set, the transfer is handed to the front
+    proxy: X-Accel-Redirect points nginx at MEDIA_INTERNAL_URL and
+    X-Sendfile gives Apache or lighttpd the file path. Otherwise the file
+    is streamed by a FileResponse honouring single byte ranges.
+    """
+    stat = os.stat(path)
+    etag = file_etag(name, stat)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = _file_response(request, name, path, stat, etag)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    patch_cache_control(
+        response,
+        private=True,
+        max_age=MEDIA_MAX_AGE,
+        immutable=True
+    )
+    return response
+
+
+def _file_response(request, name, path, stat, etag):
+    content_type = mimetypes.guess_type(name)[0] \
+        or "application/octet-stream"
+    header = getattr(settings, "MEDIA_SENDFILE_HEADER", "")
+    if header:
+        response = HttpResponse(content_type=content_type)
+        if header.lower() == "x-accel-redirect":
+            response[header] = quote(settings.MEDIA_INTERNAL_URL + name)
+        else:
+            response[header] = path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if "HTTP_RANGE" in request.META and if_range in (None, etag):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(file, start, end - start + 1),
+            status=206,
+            content_type=content_type
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
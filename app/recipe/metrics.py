@@ -0,0 +1,16 @@
+from recipe.autocomplete import indexes
+from recipe.cache import response_cache
+
+
+def cache_metrics():
+    """Return the response cache and autocomplete metrics as samples"""
+    samples = [
+        (f"response_cache_{key}_total", "counter", {}, value)
+        for key, value in sorted(response_cache.stats().items())
+    ]
+    stats = indexes.stats()
+    samples += [
+        ("autocomplete_indexes", "gauge", {}, stats["indexes"]),
+        ("autocomplete_keys", "gauge", {}, stats["keys"]),
+    ]
+    return samples
@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination seeking on a unique tuple of ordering fields
+
+    The cursor holds the ordering values of the row at the page boundary,
+    so every page is read with an indexed range condition instead of an
+    OFFSET, and its cost does not grow with the depth of the page. Fields
+    prefixed with "-" are ordered descending.
+    """
+    ordering = ("id",)
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = _("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of results seeking from the cursor"""
+        self.request = request
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(
+                *(self._flip(field) for field in self.ordering)
+            )
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, reverse))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        self.page = results[:page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view=None):
+        """Return the unique tuple of fields the queryset is paged by"""
+        return self.ordering
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client within limits"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def seek_filter(self, position, reverse):
+        """Build a filter for rows after (or before) the given position"""
+        fields = [field.lstrip("-") for field in self.ordering]
+        condition = Q()
+        for index, field in enumerate(fields):
+            equal = dict(zip(fields[:index], position))
+            descending = self.ordering[index].startswith("-")
+            lookup = "lt" if descending != reverse else "gt"
+            condition |= Q(**equal, **{f"{field}__{lookup}": position[index]})
+        return condition
+
+    def get_position(self, instance):
+        """Return the ordering values of an instance"""
+        return [
+            getattr(instance, field.lstrip("-")) for field in self.ordering
+        ]
+
+    def _flip(self, field):
+        return field[1:] if field.startswith("-") else "-" + field
+
+    def encode_cursor(self, position, reverse):
+        """Return a link to the page starting at the given position"""
+        data = {"p": position}
+        if reverse:
+            data["r"] = 1
+        token = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(",", ":")).encode()
+        ).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """Return the (position, reverse) pair held in the cursor"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()))
+            position = data["p"]
+            reverse = bool(data.get("r"))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                self.to_python(field.lstrip("-"), value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def to_python(self, field, value):
+        """Convert a cursor value to the type of its ordering field"""
+        try:
+            model_field = self.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            # annotations such as a search rank are floats
+            return None if value is None else float(value)
+        return model_field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+
+class RecipePagination(KeysetPagination):
+    """Paginate recipes in creation order, or by rank when searching"""
+    ordering = ("id",)
+
+    def get_ordering(self, request, queryset, view=None):
+        if "rank" in queryset.query.annotations:
+            return ("-rank", "id")
+        return ("id",)
+
+
+class RecipeAttrPagination(KeysetPagination):
+    """Paginate tags and ingredients alphabetically"""
+    ordering = ("name", "id")
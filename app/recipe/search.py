@@ -0,0 +1,96 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Func, Lookup, Q, TextField, \
+    Value
+from django.db.models.functions import Cast
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+from core.models import SEARCH_CONFIG
+
+WORD_RE = re.compile(r"\w+")
+
+
+@TextField.register_lookup
+class TrigramWordSimilar(Lookup):
+    """``field %> value``: some word of field is similar to value"""
+    lookup_name = "trigram_word_similar"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} %%> {rhs}", lhs_params + rhs_params
+
+
+class WordSimilarity(Func):
+    function = "word_similarity"
+    output_field = FloatField()
+
+
+_trigram_support = {}
+
+
+def trigram_available(using="default"):
+    """Return whether the database has the pg_trgm index on search_text"""
+    if using not in _trigram_support:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_indexes "
+                "WHERE indexname = 'core_recipe_search_text_trgm_idx'"
+            )
+            _trigram_support[using] = cursor.fetchone() is not None
+    return _trigram_support[using]
+
+
+class RecipeSearch:
+    """Full-text search over recipe titles, ingredients and tags
+
+    ``?q=`` is split into words that must all prefix-match a word of the
+    recipe's stored search vector. Where pg_trgm is installed, recipes
+    having a word similar to the query are matched too, so that typos
+    still find results. Matches are annotated with a `rank` combining
+    the weighted text rank (title over ingredients over tags) and the
+    trigram similarity.
+    """
+    query_param = "q"
+    max_length = 200
+    max_words = 10
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    @property
+    def text(self):
+        return self.query_params.get(self.query_param, "").strip()
+
+    def filter_queryset(self, queryset):
+        """Keep and rank the recipes matching the search, if any"""
+        text = self.text
+        if not text:
+            return queryset
+        if len(text) > self.max_length:
+            raise ValidationError({self.query_param: [
+                _("Ensure this field has no more than {max_length} "
+                  "characters.").format(max_length=self.max_length)
+            ]})
+        words = WORD_RE.findall(text.lower())[:self.max_words]
+        if not words:
+            return queryset.none()
+
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            config=SEARCH_CONFIG,
+            search_type="raw"
+        )
+        condition = Q(search_vector=query)
+        rank = SearchRank(F("search_vector"), query)
+        if trigram_available(queryset.db):
+            phrase = " ".join(words)
+            condition |= Q(search_text__trigram_word_similar=phrase)
+            rank = rank + WordSimilarity(Value(phrase), "search_text")
+        # float8 keeps the rank exact through keyset pagination cursors
+        return queryset.filter(condition).annotate(
+            rank=Cast(rank, FloatField())
+        )
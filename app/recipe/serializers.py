@@ -1,10 +1,23 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import UniqueConstraint
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from core import models
+from core.metrics import TimedSerializerMixin
+from recipe.images import VARIANT_FIELDS
 
 
-class BaseRecipeAttrSerializer(serializers.ModelSerializer):
+def violated_constraint(exc):
+    """Return the name of the constraint an IntegrityError violated"""
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
+
+class BaseRecipeAttrSerializer(TimedSerializerMixin,
+                               serializers.ModelSerializer):
     """Serializer base class"""
     user = serializers.PrimaryKeyRelatedField(
             read_only=True,
@@ -15,6 +28,29 @@ class BaseRecipeAttrSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "user")
         read_only_fields = ("id", )
 
+    def create(self, validated_data):
+        """Create an item, relying on the (user, name) unique constraint"""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError as exc:
+            if violated_constraint(exc) not in self.unique_name_constraints():
+                raise
+            msg = _("The fields name, user must make a unique set.")
+            raise serializers.ValidationError(
+                {"non_field_errors": [msg]},
+                code="unique"
+            )
+
+    def unique_name_constraints(self):
+        """Return the names of the unique constraints on the item name"""
+        return {
+            constraint.name
+            for constraint in self.Meta.model._meta.constraints
+            if isinstance(constraint, UniqueConstraint)
+            and "name" in constraint.fields
+        }
+
 
 class TagSerializer(BaseRecipeAttrSerializer):
     """Serializer for a Tag model"""
@@ -22,13 +58,6 @@ class TagSerializer(BaseRecipeAttrSerializer):
     class Meta(BaseRecipeAttrSerializer.Meta):
         model = models.Tag
 
-        validators = [
-            UniqueTogetherValidator(
-                queryset=models.Tag.objects.all(),
-                fields=['name', "user"]
-            )
-        ]
-
 
 class IngredientSerializer(BaseRecipeAttrSerializer):
     """Serializer for an ingredient object"""
@@ -36,43 +65,175 @@ class IngredientSerializer(BaseRecipeAttrSerializer):
     class Meta(BaseRecipeAttrSerializer.Meta):
         model = models.Ingredient
 
-        validators = [
-            UniqueTogetherValidator(
-                queryset=models.Ingredient.objects.all(),
-                fields=['name', "user"]
-            )
-        ]
-
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer Recipe"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+class UserManyRelatedField(serializers.ManyRelatedField):
+    """Resolve a list of primary keys with a single query"""
+    default_error_messages = {
+        "does_not_exist": _("Invalid pk {pk_values} - "
+                            "objects do not exist."),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for pk in data:
+            try:
+                pks.append(pk_field.to_python(pk))
+            except DjangoValidationError:
+                self.child_relation.fail(
+                    "incorrect_type",
+                    data_type=type(pk).__name__
+                )
+        pks = list(dict.fromkeys(pks))
+        objects = queryset.in_bulk(pks)
+        missing = [str(pk) for pk in pks if pk not in objects]
+        if missing:
+            self.fail("does_not_exist", pk_values=", ".join(missing))
+        return [objects[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field accepting only objects of the request user"""
+
+    def get_queryset(self):
+        request = self.context.get("request")
+        if request is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(user=request.user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserManyRelatedField(**list_kwargs)
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer Recipe
+
+    The `fields` of the context, when given, limit the serialized fields,
+    and the relations in its `expand`, `default_expand` without one, are
+    nested as objects in place of primary keys, read only.
+    """
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=models.Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=models.Tag.objects.all()
     )
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Recipe
         fields = (
             'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price',
-            'link',
+            'link', 'image', 'image_status', 'image_variants',
+        )
+        read_only_fields = ('id', 'image', 'image_status')
+
+    expandable_fields = {
+        "ingredients": IngredientSerializer,
+        "tags": TagSerializer,
+    }
+    default_expand = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        self.expand = [
+            name for name in self.context.get("expand", self.default_expand)
+            if name in self.fields
+        ]
+        for name in self.expand:
+            self.expand_field(name)
+
+    def expand_field(self, name):
+        """Nest the objects of a relation in place of their primary keys"""
+        self.fields[name] = self.expandable_fields[name](
+            many=True, read_only=True
         )
-        read_only_fields = ('id',)
+
+    def get_image_variants(self, obj):
+        """Return the URLs of the resized copies of the recipe image"""
+        request = self.context.get("request")
+        variants = {}
+        for field in VARIANT_FIELDS:
+            field_file = getattr(obj, field)
+            url = field_file.url if field_file else None
+            if url and request is not None:
+                url = request.build_absolute_uri(url)
+            variants[field[len("image_"):]] = url
+        return variants
+
+
+class RecipeSummarySerializer(RecipeSerializer):
+    """Read only recipe serializer taking relations from the summary"""
+    ingredients = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+
+    def expand_field(self, name):
+        # the summary holds the names, see summary_items
+        pass
+
+    def get_ingredients(self, obj):
+        return self.summary_items(obj, "ingredients")
+
+    def get_tags(self, obj):
+        return self.summary_items(obj, "tags")
+
+    def summary_items(self, obj, name):
+        items = obj.summary[name]
+        if name in self.expand:
+            return [
+                {"id": item["id"], "name": item["name"], "user": obj.user_id}
+                for item in items
+            ]
+        return [item["id"] for item in items]
 
 
 class RecipeDetailSerializer(RecipeSerializer):
-    ingredients = IngredientSerializer(many=True, read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    default_expand = ("ingredients", "tags")
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """Serializer for uploading images to recipe"""
 
     class Meta:
         model = models.Recipe
-        fields = ("id", "image")
-        read_only_fields = ("id",)
+        fields = ("id", "image", "image_status")
+        read_only_fields = ("id", "image_status")
+        extra_kwargs = {"image": {"required": True, "allow_null": False}}
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    """Serializer for a recipe row of an import, naming its relations"""
+    title = serializers.CharField(max_length=255)
+    time_minutes = serializers.IntegerField(min_value=1, max_value=520000)
+    price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    link = serializers.CharField(
+        max_length=255,
+        allow_blank=True,
+        default=""
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        default=list
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        default=list
+    )
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient
+from recipe import autocomplete
+
+# connected after the receivers of core, which bump the collection versions
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_item_name(sender, instance, **kwargs):
+    """Keep the autocomplete index of the item's owner in sync"""
+    autocomplete.item_changed(
+        sender, instance.user_id, instance.pk, instance.name
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def unindex_item_name(sender, instance, **kwargs):
+    """Drop a deleted item from the autocomplete index of its owner"""
+    autocomplete.item_changed(sender, instance.user_id, instance.pk)
@@ -0,0 +1,56 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsMixin:
+    """Serve the fields named in ?fields= and expand those in ?expand=
+
+    Both take comma separated field names of the serializer and apply to
+    the `sparse_actions`; relations in `expandable_fields` are expanded by
+    the `expanded_actions` unless ?expand= names others. The requested
+    names are passed to the serializer in its context and are available
+    to get_queryset from get_sparse_fields.
+    """
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+    sparse_actions = ("list", "retrieve")
+    expandable_fields = ()
+    expanded_actions = ()
+
+    def get_sparse_fields(self):
+        """Return (fields, expand), fields None to serve all of them"""
+        if self.action not in self.sparse_actions:
+            return None, ()
+        if not hasattr(self, "_sparse_fields"):
+            available = self.get_serializer_class().Meta.fields
+            fields = self._parse_names(
+                self.fields_query_param, available
+            ) or None
+            expand = self._parse_names(
+                self.expand_query_param, self.expandable_fields
+            )
+            if expand is None:
+                expand = self.expandable_fields \
+                    if self.action in self.expanded_actions else ()
+            if fields is not None:
+                expand = [name for name in expand if name in fields]
+            self._sparse_fields = fields, tuple(expand)
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.sparse_actions:
+            context["fields"], context["expand"] = self.get_sparse_fields()
+        return context
+
+    def _parse_names(self, param, available):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: [
+                _("Unknown fields: {names}.").format(names=", ".join(unknown))
+            ]})
+        return list(dict.fromkeys(names))
@@ -0,0 +1,173 @@
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user
+from core.models import Tag, Ingredient
+from recipe.autocomplete import PrefixIndex, indexes
+
+TAG_AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
+INGREDIENT_AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
+
+
+class PrefixIndexTests(TestCase):
+    """Test the sorted array prefix index"""
+
+    def test_search_names_then_words(self):
+        """Test name prefixes rank before prefixes of later words"""
+        index = PrefixIndex([(1, "Red onion"), (2, "Onion"), (3, "Oil")])
+
+        self.assertEqual(index.search("o", 10), [
+            (3, "Oil"), (2, "Onion"), (1, "Red onion")
+        ])
+        self.assertEqual(index.search("ONI", 10), [
+            (2, "Onion"), (1, "Red onion")
+        ])
+        self.assertEqual(index.search("red o", 10), [(1, "Red onion")])
+        self.assertEqual(index.search("o", 2), [(3, "Oil"), (2, "Onion")])
+
+    def test_add_and_remove(self):
+        """Test items are renamed and removed in place"""
+        index = PrefixIndex([(1, "Salt"), (2, "Sea salt")])
+        index.add(1, "Pepper")
+        index.remove(2)
+
+        self.assertEqual(index.search("s", 10), [])
+        self.assertEqual(index.search("pep", 10), [(1, "Pepper")])
+        self.assertEqual(len(index), 1)
+
+
+class AutocompleteApiTests(TestCase):
+    """Test the autocomplete actions of tags and ingredients"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        indexes.clear()
+        self.addCleanup(indexes.clear)
+
+    def complete(self, prefix, url=INGREDIENT_AUTOCOMPLETE_URL, **params):
+        res = self.client.get(url, {"prefix": prefix, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item["name"] for item in res.data]
+
+    def test_login_required(self):
+        """Test autocomplete requires authentication"""
+        res = APIClient().get(TAG_AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_complete_own_items(self):
+        """Test suggestions come from the user's own items only"""
+        for name in ("Garlic", "Green pepper", "Ginger"):
+            Ingredient.objects.create(user=self.user, name=name)
+        other = create_user(email="other@ryszyydev.com")
+        Ingredient.objects.create(user=other, name="Grapes")
+        Tag.objects.create(user=self.user, name="Gluten free")
+
+        res = self.client.get(INGREDIENT_AUTOCOMPLETE_URL, {"prefix": "g"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["name"] for item in res.data],
+            ["Garlic", "Ginger", "Green pepper"]
+        )
+        self.assertEqual(set(res.data[0]), {"id", "name"})
+        self.assertEqual(self.complete("pep"), ["Green pepper"])
+        self.assertEqual(
+            self.complete("g", url=TAG_AUTOCOMPLETE_URL),
+            ["Gluten free"]
+        )
+
+    def test_limit(self):
+        """Test the number of suggestions is limited"""
+        for i in range(60):
+            Tag.objects.create(user=self.user, name=f"Tag {i:02}")
+        url = TAG_AUTOCOMPLETE_URL
+
+        self.assertEqual(len(self.complete("tag", url=url)), 10)
+        self.assertEqual(len(self.complete("tag", url=url, limit=3)), 3)
+        self.assertEqual(len(self.complete("tag", url=url, limit=500)), 50)
+
+    def test_follows_changes(self):
+        """Test suggestions follow created, renamed and deleted items"""
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        self.assertEqual(self.complete("s"), ["Salt"])
+
+        Ingredient.objects.create(user=self.user, name="Sugar")
+        salt.name = "Pepper"
+        salt.save()
+        self.assertEqual(self.complete("s"), ["Sugar"])
+
+        Ingredient.objects.filter(name="Sugar").delete()
+        self.assertEqual(self.complete("s"), [])
+
+    def test_follows_bulk_writes(self):
+        """Test items created in bulk are suggested"""
+        self.assertEqual(self.complete("le"), [])
+        self.client.post(
+            reverse("recipe:ingredient-bulk"),
+            [{"name": "Leek"}, {"name": "Lemon"}],
+            format="json"
+        )
+
+        self.assertEqual(self.complete("le"), ["Leek", "Lemon"])
+
+    def test_database_fallback(self):
+        """Test users with too many items are served by the database"""
+        for name in ("Rice", "Brown rice", "Radish", "Apple"):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        with patch.object(indexes, "max_user_items", 2):
+            self.assertEqual(
+                self.complete("r"),
+                ["Radish", "Rice", "Brown rice"]
+            )
+            self.assertEqual(self.complete("r", limit=1), ["Radish"])
+        self.assertEqual(indexes.stats()["keys"], 0)
+
+    def test_not_modified(self):
+        """Test unchanged suggestions are revalidated with a 304"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {"prefix": "v"})
+
+        res = self.client.get(
+            TAG_AUTOCOMPLETE_URL,
+            {"prefix": "v"},
+            HTTP_IF_NONE_MATCH=res["ETag"]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class AutocompleteIndexSyncTests(TransactionTestCase):
+    """Test committed changes update the cached index in place"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        indexes.clear()
+        self.addCleanup(indexes.clear)
+
+    def test_signals_update_cached_index(self):
+        """Test item signals keep the cached index current"""
+        tag = Tag.objects.create(user=self.user, name="Quick")
+        self.client.get(TAG_AUTOCOMPLETE_URL, {"prefix": "q"})
+
+        with patch("recipe.autocomplete.PrefixIndex") as build:
+            tag.name = "Quiet"
+            tag.save()
+            Tag.objects.create(user=self.user, name="Quinoa")
+            res = self.client.get(TAG_AUTOCOMPLETE_URL, {"prefix": "qui"})
+
+        build.assert_not_called()
+        self.assertEqual(
+            [item["name"] for item in res.data],
+            ["Quiet", "Quinoa"]
+        )
@@ -0,0 +1,142 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user, sample_recipe
+from core.models import Recipe, Tag, Ingredient
+
+RECIPE_BULK_URL = reverse("recipe:recipe-bulk")
+TAG_BULK_URL = reverse("recipe:tag-bulk")
+
+
+class BulkApiTests(TestCase):
+    """Test the bulk create/update/delete endpoints"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating recipes with relations in one request"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Tofu")
+        payload = [
+            {"title": "One", "time_minutes": 5, "price": "1.00",
+             "tags": [tag.id], "ingredients": [ingredient.id]},
+            {"title": "Two", "time_minutes": 0, "price": "1.00"},
+            {"title": "Three", "time_minutes": 5, "price": "2.00",
+             "tags": [tag.id], "ingredients": []},
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [item["status"] for item in res.data["results"]]
+        self.assertEqual(statuses, [201, 400, 201])
+        self.assertIn("time_minutes", res.data["results"][1]["errors"])
+        one = Recipe.objects.get(id=res.data["results"][0]["id"])
+        self.assertEqual(one.user, self.user)
+        self.assertEqual(list(one.tags.all()), [tag])
+        self.assertEqual(list(one.ingredients.all()), [ingredient])
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_bulk_create_uses_bulk_inserts(self):
+        """Test that the insert count does not grow with the batch"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        payload = [
+            {"title": f"Recipe {i}", "time_minutes": 5, "price": "1.00",
+             "tags": [tag.id], "ingredients": []}
+            for i in range(20)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(Recipe.objects.filter(tags=tag).count(), 20)
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating several recipes"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Old"))
+        new_tag = Tag.objects.create(user=self.user, name="New")
+        other = sample_recipe(create_user(email="other@ryszyydev.com"))
+        payload = [
+            {"id": recipe.id, "title": "Renamed", "tags": [new_tag.id]},
+            {"id": other.id, "title": "Not mine"},
+            {"title": "No id"},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format="json")
+
+        statuses = [item["status"] for item in res.data["results"]]
+        self.assertEqual(statuses, [200, 404, 400])
+        recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(recipe.title, "Renamed")
+        self.assertEqual(list(recipe.tags.all()), [new_tag])
+        self.assertEqual(other.title, "Sample recipe")
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting several recipes by id"""
+        recipe = sample_recipe(self.user)
+        other = sample_recipe(create_user(email="other@ryszyydev.com"))
+
+        res = self.client.delete(
+            RECIPE_BULK_URL, [recipe.id, other.id], format="json"
+        )
+
+        statuses = [item["status"] for item in res.data["results"]]
+        self.assertEqual(statuses, [204, 404])
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_bulk_rejects_boolean_ids(self):
+        """Test that booleans are not taken for integer ids"""
+        sample_recipe(self.user, id=1)
+
+        res = self.client.patch(
+            RECIPE_BULK_URL, [{"id": True, "title": "Renamed"}], format="json"
+        )
+        self.assertEqual(res.data["results"][0]["errors"],
+                         {"id": ["Expected an integer id."]})
+
+        res = self.client.delete(RECIPE_BULK_URL, [True], format="json")
+        self.assertEqual(res.data["results"][0]["errors"],
+                         {"id": ["Expected an integer id."]})
+        self.assertTrue(
+            Recipe.objects.filter(pk=1, title="Sample recipe").exists()
+        )
+
+    def test_bulk_create_tags_rejects_duplicate_names(self):
+        """Test that taken or repeated names are reported per item"""
+        Tag.objects.create(user=self.user, name="Taken")
+        payload = [{"name": "Taken"}, {"name": "New"}, {"name": "New"}]
+
+        res = self.client.post(TAG_BULK_URL, payload, format="json")
+
+        statuses = [item["status"] for item in res.data["results"]]
+        self.assertEqual(statuses, [400, 201, 400])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_rejects_too_many_items(self):
+        """Test that the batch size is limited"""
+        payload = [{"name": f"tag {i}"} for i in range(501)]
+
+        res = self.client.post(TAG_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_rejects_non_list(self):
+        """Test that the payload must be a list"""
+        res = self.client.post(TAG_BULK_URL, {"name": "x"}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,99 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user, sample_recipe
+from core.models import Tag
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+class ConditionalGetTests(TestCase):
+    """Test conditional GET requests on the recipe API"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user)
+
+    def test_list_not_modified(self):
+        """Test that a matching ETag is answered without reading rows"""
+        res = self.client.get(RECIPE_URL)
+        etag = res["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_detail_not_modified_since(self):
+        """Test that If-Modified-Since is honoured on detail"""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        res = self.client.get(url)
+
+        res = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=res["Last-Modified"]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_change_modifies_list(self):
+        """Test that saving a recipe changes the ETag"""
+        etag = self.client.get(RECIPE_URL)["ETag"]
+        self.recipe.title = "New title"
+        self.recipe.save()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_relation_change_modifies_list(self):
+        """Test that adding a tag to a recipe changes the ETag"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        etag = self.client.get(RECIPE_URL)["ETag"]
+        self.recipe.tags.add(tag)
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_query_params_change_etag(self):
+        """Test that different pages or filters get different ETags"""
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        res = self.client.get(
+            RECIPE_URL,
+            {"page_size": 1},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_user_change_keeps_etag(self):
+        """Test that changes by other users do not modify the list"""
+        etag = self.client.get(TAGS_URL)["ETag"]
+        Tag.objects.create(user=create_user(email="o@ryszyydev.com"), name="x")
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_bulk_create_modifies_list(self):
+        """Test that bulk writes change the ETag"""
+        etag = self.client.get(TAGS_URL)["ETag"]
+        self.client.post(
+            reverse("recipe:tag-bulk"),
+            [{"name": "Vegan"}],
+            format="json"
+        )
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
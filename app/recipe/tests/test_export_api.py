@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user, sample_recipe
+from core.models import Tag, Ingredient
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+class RecipeExportApiTests(TestCase):
+    """Test the streaming export of recipes"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **kwargs):
+        res = self.client.get(EXPORT_URL, **kwargs)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_login_required(self):
+        """Test exporting requires authentication"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        """Test recipes are streamed as one JSON object per line"""
+        recipe = sample_recipe(self.user, "Soup", link="https://soup")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Leek"),
+            Ingredient.objects.create(user=self.user, name="Carrot")
+        )
+        sample_recipe(create_user(email="other@ryszyydev.com"), "Other")
+
+        res, content = self.export()
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn("recipes.ndjson", res["Content-Disposition"])
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [{
+                "id": recipe.id, "title": "Soup", "time_minutes": 10,
+                "price": "5.00", "link": "https://soup", "tags": ["Vegan"],
+                "ingredients": ["Carrot", "Leek"],
+            }]
+        )
+
+    def test_export_csv(self):
+        """Test ?format=csv and Accept: text/csv stream CSV rows"""
+        recipe = sample_recipe(self.user, 'Pie, "apple"')
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Sweet"))
+
+        for kwargs in ({"data": {"format": "csv"}},
+                       {"HTTP_ACCEPT": "text/csv"}):
+            res, content = self.export(**kwargs)
+
+            self.assertTrue(res["Content-Type"].startswith("text/csv"))
+            rows = list(csv.DictReader(io.StringIO(content)))
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]["title"], 'Pie, "apple"')
+            self.assertEqual(json.loads(rows[0]["tags"]), ["Sweet"])
+            self.assertEqual(json.loads(rows[0]["ingredients"]), [])
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_in_chunks(self):
+        """Test queries grow with the number of chunks, not of recipes"""
+        tag = Tag.objects.create(user=self.user, name="Quick")
+        for i in range(5):
+            sample_recipe(self.user, f"Recipe {i}").tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            _, content = self.export()
+
+        titles = [json.loads(line)["title"] for line in content.splitlines()]
+        self.assertEqual(titles, [f"Recipe {i}" for i in range(5)])
+        recipe_queries = [
+            query for query in queries.captured_queries
+            if 'FROM "core_recipe"' in query["sql"]
+        ]
+        # three chunks and the empty read that ends the export
+        self.assertEqual(len(recipe_queries), 4)
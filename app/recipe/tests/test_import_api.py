@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user
+from core.models import CollectionVersion, Recipe, Tag, Ingredient
+
+IMPORT_URL = reverse("recipe:recipe-import-recipes")
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def ndjson(*records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def record(title, **params):
+    return {"title": title, "time_minutes": 10, "price": "5.00", **params}
+
+
+class RecipeImportApiTests(TestCase):
+    """Test importing recipes from uploaded files"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name="recipes.ndjson", **data):
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post(
+            IMPORT_URL, {"file": file, **data}, format="multipart"
+        )
+
+    def test_import_ndjson(self):
+        """Test records are created with their tags and ingredients"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.upload(ndjson(
+            record("Soup", tags=["Vegan"], ingredients=["Leek", "Leek"]),
+            record("Stew", ingredients=["Leek", "Beans"], link="https://s"),
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(res.data["position"], 2)
+        soup = Recipe.objects.get(user=self.user, title="Soup")
+        self.assertEqual([t.name for t in soup.tags.all()], ["Vegan"])
+        self.assertEqual([i.name for i in soup.ingredients.all()], ["Leek"])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+        self.assertTrue(
+            Recipe.objects.filter(search_vector="beans").exists()
+        )
+
+    def test_invalid_records_are_reported(self):
+        """Test invalid records are skipped with their line numbers"""
+        res = self.upload(
+            ndjson(record("Soup"))
+            + "{not json\n"
+            + ndjson(record("Cake", time_minutes=0), record("Pie"))
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(res.data["failed"], 2)
+        self.assertEqual(
+            [error["line"] for error in res.data["errors"]], [2, 3]
+        )
+        self.assertIn("time_minutes", res.data["errors"][1]["errors"])
+
+    def test_resume_from_start(self):
+        """Test records before start are skipped"""
+        res = self.upload(
+            ndjson(record("Soup"), record("Stew"), record("Pie")),
+            start=2
+        )
+
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["position"], 3)
+        self.assertEqual(
+            list(Recipe.objects.values_list("title", flat=True)), ["Pie"]
+        )
+
+    def test_export_round_trip(self):
+        """Test a CSV export imports back into another account"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pie, "apple"', time_minutes=5, price=2
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Sweet"))
+        res = self.client.get(EXPORT_URL, {"format": "csv"})
+        content = b"".join(res.streaming_content).decode()
+
+        other = create_user(email="other@ryszyydev.com")
+        self.client.force_authenticate(other)
+        res = self.upload(content, name="recipes.csv")
+
+        self.assertEqual(res.data["created"], 1)
+        imported = Recipe.objects.get(user=other)
+        self.assertEqual(imported.title, 'Pie, "apple"')
+        self.assertEqual(imported.tags.get().user, other)
+
+    def test_bumps_collection_versions(self):
+        """Test imports change the version stamps readers compare"""
+        before = dict(CollectionVersion.objects.filter(user=self.user)
+                      .values_list("collection", "version"))
+        self.upload(ndjson(record("Soup", ingredients=["Leek"])))
+
+        after = dict(CollectionVersion.objects.filter(user=self.user)
+                     .values_list("collection", "version"))
+        self.assertGreater(after["recipe"], before["recipe"])
+        self.assertGreater(after["ingredient"], before["ingredient"])
+        self.assertEqual(after["tag"], before["tag"])
+
+    def test_file_required(self):
+        """Test a request without a file is rejected"""
+        res = self.client.post(IMPORT_URL, {}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes management command"""
+
+    def setUp(self):
+        self.user = create_user()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "recipes.ndjson")
+        self.checkpoint = os.path.join(directory.name, "checkpoint.json")
+
+    def test_import_in_chunks_with_checkpoint(self):
+        """Test chunks are committed and the checkpoint resumes imports"""
+        with open(self.path, "w") as f:
+            f.write(ndjson(*[record(f"Recipe {i}") for i in range(5)]))
+        out = StringIO()
+
+        call_command(
+            "import_recipes", self.path, email=self.user.email,
+            chunk_size=2, checkpoint=self.checkpoint, stdout=out
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertIn("2 records, 2 created", out.getvalue())
+        self.assertIn("records/s", out.getvalue())
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f), {"position": 5})
+
+        with open(self.path, "a") as f:
+            f.write(ndjson(record("Recipe 5")))
+        call_command(
+            "import_recipes", self.path, email=self.user.email,
+            checkpoint=self.checkpoint, stdout=StringIO()
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 6)
+
+    @override_settings(RECIPE_IMPORT_CHUNK_SIZE=3)
+    def test_chunk_size_setting(self):
+        """Test the chunk size defaults to RECIPE_IMPORT_CHUNK_SIZE"""
+        with open(self.path, "w") as f:
+            f.write(ndjson(*[record(f"Recipe {i}") for i in range(4)]))
+        out = StringIO()
+
+        call_command(
+            "import_recipes", self.path, email=self.user.email, stdout=out
+        )
+
+        self.assertIn("3 records, 3 created", out.getvalue())
@@ -0,0 +1,128 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user
+from core.models import Recipe
+
+CONTENT = b"0123456789abcdef"
+
+
+def media_url(name):
+    """Return the URL serving a stored media file"""
+    return reverse("media", args=[name])
+
+
+class RecipeMediaApiTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, media_root)
+
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Recipe",
+            time_minutes=5,
+            price=5
+        )
+        self.recipe.image.save("photo.jpg", ContentFile(CONTENT))
+        self.url = media_url(self.recipe.image.name)
+
+    def test_serve_owned_image(self):
+        """Test the owner gets the image with long lived cache headers"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertIn("private", res["Cache-Control"])
+
+    def test_image_of_other_user_not_found(self):
+        """Test images of other users' recipes are not served"""
+        self.client.force_authenticate(create_user(email="other@test.com"))
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_image_requires_authentication(self):
+        """Test anonymous requests are rejected"""
+        res = APIClient().get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_not_modified(self):
+        """Test a matching If-None-Match is answered with a 304"""
+        etag = self.client.get(self.url)["ETag"]
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_byte_ranges(self):
+        """Test single byte ranges are answered with partial content"""
+        cases = {
+            "bytes=2-5": (b"2345", "bytes 2-5/16"),
+            "bytes=10-": (b"abcdef", "bytes 10-15/16"),
+            "bytes=-3": (b"def", "bytes 13-15/16"),
+        }
+        for header, (content, content_range) in cases.items():
+            res = self.client.get(self.url, HTTP_RANGE=header)
+
+            self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(b"".join(res.streaming_content), content)
+            self.assertEqual(res["Content-Range"], content_range)
+            self.assertEqual(res["Content-Length"], str(len(content)))
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file is rejected"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=100-")
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(res["Content-Range"], "bytes */16")
+
+    def test_stale_if_range_sends_whole_file(self):
+        """Test a range for another version of the file is ignored"""
+        res = self.client.get(
+            self.url,
+            HTTP_RANGE="bytes=2-5",
+            HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect")
+    def test_accel_redirect(self):
+        """Test nginx is told to send the file from its internal location"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res["X-Accel-Redirect"],
+            "/internal-media/" + self.recipe.image.name
+        )
+        self.assertEqual(res.content, b"")
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Sendfile")
+    def test_sendfile(self):
+        """Test the proxy is given the path of the file"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res["X-Sendfile"], self.recipe.image.path)
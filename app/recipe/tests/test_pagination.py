@@ -0,0 +1,108 @@
+import base64
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user
+from core.models import Recipe, Tag
+
+TAGS_URL = reverse("recipe:tag-list")
+RECIPE_URL = reverse("recipe:recipe-list")
+
+
+def make_cursor(position):
+    data = json.dumps({"p": position}).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the recipe API"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _walk(self, url, params):
+        """Follow next links and return the list of visited pages"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            if not res.data["next"]:
+                return pages
+            res = self.client.get(res.data["next"])
+
+    def test_recipes_paginated_by_id(self):
+        """Test that recipe pages cover every recipe once in id order"""
+        ids = [
+            Recipe.objects.create(
+                user=self.user, title=f"Recipe {i}", time_minutes=5, price=1
+            ).id
+            for i in range(5)
+        ]
+
+        pages = self._walk(RECIPE_URL, {"page_size": 2})
+
+        self.assertEqual([len(page["results"]) for page in pages], [2, 2, 1])
+        seen = [r["id"] for page in pages for r in page["results"]]
+        self.assertEqual(seen, ids)
+        self.assertIsNone(pages[0]["previous"])
+
+    def test_tags_paginated_by_name_and_id(self):
+        """Test that tag pages are ordered by name then id"""
+        other = create_user(email="other@ryszyydev.com")
+        for name in ("b", "a", "d", "c"):
+            Tag.objects.create(user=self.user, name=name)
+        Tag.objects.create(user=other, name="aa")
+
+        pages = self._walk(TAGS_URL, {"page_size": 3})
+
+        names = [t["name"] for page in pages for t in page["results"]]
+        self.assertEqual(names, ["a", "b", "c", "d"])
+
+    def test_previous_link_returns_previous_page(self):
+        """Test that following previous returns the page before"""
+        for name in ("a", "b", "c", "d", "e"):
+            Tag.objects.create(user=self.user, name=name)
+
+        first = self.client.get(TAGS_URL, {"page_size": 2})
+        second = self.client.get(first.data["next"])
+        res = self.client.get(second.data["previous"])
+
+        self.assertEqual(res.data["results"], first.data["results"])
+        self.assertIsNone(res.data["previous"])
+
+    def test_invalid_page_size_uses_default(self):
+        """Test that an invalid page size falls back to the default"""
+        for name in ("a", "b", "c"):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": "nope"})
+
+        self.assertEqual(len(res.data["results"]), 3)
+        self.assertIsNone(res.data["next"])
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        res = self.client.get(TAGS_URL, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_checked(self):
+        """Test that cursor values not matching their fields are rejected"""
+        for position in (["abc"], [None], [{"a": 1}]):
+            res = self.client.get(RECIPE_URL,
+                                  {"cursor": make_cursor(position)})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(RECIPE_URL, {"q": "soup",
+                                           "cursor": make_cursor(["x", 1])})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,17 +1,23 @@
 import tempfile
 import os
 
+from types import SimpleNamespace
+from unittest.mock import patch
+
 from PIL import Image
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.helpers import create_user
+from core.db.pool import PoolTimeout
+from core.helpers import create_user, sample_recipe
 from core.models import Recipe, Tag, Ingredient
 
+from recipe import images
+from recipe.images import VARIANT_FIELDS
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPE_URL = reverse("recipe:recipe-list")
@@ -22,17 +28,6 @@ def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
-def sample_recipe(user, **params):
-    """Create sample recipe"""
-    defaults = {
-        "title": "Sample recipe title",
-        "time_minutes": 10,
-        "price": 5.0
-    }
-    defaults.update(params)
-    return Recipe.objects.create(user=user, **defaults)
-
-
 def sample_tag(user, name="Main course"):
     """Create and return a sample tag"""
     return Tag.objects.create(user=user, name=name)
@@ -79,7 +74,7 @@ class PrivateRecipeApiTests(TestCase):
         ingredients = Recipe.objects.all().order_by("id")
         serializer = RecipeSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test that only recipes for authenticated user are returned"""
@@ -91,8 +86,8 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.get(RECIPE_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["title"], recipe.title)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["title"], recipe.title)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -161,6 +156,53 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tags(self):
+        """Test that tags of other users are rejected"""
+        other_user = create_user(email="other@ryszyydev.com")
+        tag = sample_tag(self.user, name="Mine")
+        other_tags = [
+            sample_tag(other_user, name="Theirs 1"),
+            sample_tag(other_user, name="Theirs 2"),
+        ]
+        payload = {
+            "title": "Cheese cake",
+            "tags": [tag.id] + [t.id for t in other_tags],
+            "time_minutes": 30,
+            "price": 15.0
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        for other_tag in other_tags:
+            self.assertIn(str(other_tag.id), str(res.data["tags"]))
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_related_ids_validated_in_one_query(self):
+        """Test that a list of ingredient ids is resolved at once"""
+        ingredients = [
+            sample_ingredient(self.user, name=f"ingredient{i}")
+            for i in range(50)
+        ]
+        payload = {
+            "title": "Cheese cake",
+            "ingredients": [ingredient.id for ingredient in ingredients],
+            "tags": [],
+            "time_minutes": 30,
+            "price": 15.0
+        }
+        serializer = RecipeSerializer(
+            data=payload,
+            context={"request": SimpleNamespace(user=self.user)}
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(
+            serializer.validated_data["ingredients"],
+            ingredients
+        )
+
     def test_partial_update_recipe(self):
         """"Test that partial update is successful"""
         recipe = sample_recipe(self.user)
@@ -212,22 +254,106 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self) -> None:
-        self.recipe.image.delete()
+        self.recipe.refresh_from_db()
+        for field in ("image",) + VARIANT_FIELDS:
+            getattr(self.recipe, field).delete()
 
-    def test_upload_image_to_recipe(self):
-        """Test uploading an image to recipe"""
+    def upload(self, size=(10, 10), image_format="JPEG", **save_kwargs):
         url = image_upload_url(self.recipe.id)
         with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
-            img = Image.new("RGB", (10, 10))
-            img.save(ntf, format="JPEG")
+            img = Image.new("RGB", size)
+            img.save(ntf, format=image_format, **save_kwargs)
             ntf.seek(0)
-            res = self.client.post(url, {"image": ntf}, format="multipart")
+            return self.client.post(url, {"image": ntf}, format="multipart")
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_to_recipe(self):
+        """Test uploading an image to recipe"""
+        res = self.upload()
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_generates_variants(self):
+        """Test processing an upload resizes it and strips its metadata"""
+        exif = Image.Exif()
+        exif[0x010f] = "Camera maker"
+        res = self.upload(size=(2000, 1000), exif=exif)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        with Image.open(self.recipe.image.path) as img:
+            self.assertEqual(len(img.getexif()), 0)
+        expected = {
+            "image_thumbnail": ((150, 75), "JPEG"),
+            "image_medium": ((600, 300), "JPEG"),
+            "image_webp": ((1200, 600), "WEBP"),
+        }
+        for field, (size, image_format) in expected.items():
+            with Image.open(getattr(self.recipe, field).path) as img:
+                self.assertEqual(img.size, size)
+                self.assertEqual(img.format, image_format)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data["image_status"], Recipe.IMAGE_READY)
+        self.assertTrue(
+            res.data["image_variants"]["thumbnail"].startswith("http")
+        )
+
+    def test_upload_image_is_processed_after_commit(self):
+        """Test the upload responds before its image is processed"""
+        with patch("recipe.images.get_executor") as get_executor:
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["image_status"], Recipe.IMAGE_PENDING)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image_thumbnail)
+        # TestCase never commits, so the job is never handed to the pool
+        get_executor.assert_not_called()
+
+    def test_upload_image_processing_changes_etag(self):
+        """Test starting to process an image is served with a new ETag"""
+        with patch("recipe.images.get_executor"):
+            self.upload()
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+
+        with patch("recipe.images._finish"):
+            images.process(self.recipe.id)
+
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(res.data["image_status"], Recipe.IMAGE_PROCESSING)
+
+    def test_upload_image_worker_failure(self):
+        """Test an image the worker fails to process is marked failed"""
+        with patch("recipe.images.get_executor"):
+            self.upload()
+        etags = {
+            url: self.client.get(url)["ETag"]
+            for url in (RECIPE_URL, detail_url(self.recipe.id))
+        }
+
+        with patch("recipe.images.process", side_effect=PoolTimeout), \
+                patch("recipe.images.connection"), \
+                self.assertLogs("recipe.images", "ERROR"):
+            images._run_in_worker(self.recipe.pk)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        for url, etag in etags.items():
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(res["ETag"], etag)
+            data = res.data["results"][0] if url == RECIPE_URL else res.data
+            self.assertEqual(data["image_status"], Recipe.IMAGE_FAILED)
+
     def test_upload_image_bad_request(self):
         """Test uploading and invalid image"""
         url = image_upload_url(self.recipe.id)
@@ -255,9 +381,9 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
 
     def test_filter_recipe_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -277,6 +403,140 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test that recipe endpoints run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def _add_recipes(self, count):
+        """Create recipes, each with its own tag and ingredient"""
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            recipe = sample_recipe(user=self.user, title=f"Recipe {i}")
+            recipe.tags.add(sample_tag(user=self.user, name=f"Tag {i}"))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f"Ingredient {i}")
+            )
+            yield recipe
+
+    def assertConstantQueries(self, num, url_func, sizes=(1, 10)):
+        """Assert that url_func(recipes) runs num queries for every size"""
+        for size in sizes:
+            url = url_func(list(self._add_recipes(size)))
+            with self.assertNumQueries(num):
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not query once per recipe"""
+        self.assertConstantQueries(2, lambda recipes: RECIPE_URL)
+
+    @override_settings(RECIPE_LIST_READ_MODEL=False)
+    def test_list_query_count_without_read_model(self):
+        """Test relations are prefetched when the summary is not used"""
+        self.assertConstantQueries(4, lambda recipes: RECIPE_URL)
+
+    def test_detail_query_count_is_constant(self):
+        """Test retrieving a recipe does not query once per relation"""
+        def url_func(recipes):
+            recipe = recipes[0]
+            for other in recipes[1:]:
+                recipe.tags.add(*other.tags.all())
+                recipe.ingredients.add(*other.ingredients.all())
+            return detail_url(recipe.id)
+
+        self.assertConstantQueries(4, url_func)
+
+    def test_list_includes_related_ids(self):
+        """Test that prefetched relations are still serialized"""
+        recipe, = self._add_recipes(1)
+
+        res = self.client.get(RECIPE_URL)
+
+        serializer = RecipeSerializer([recipe], many=True)
+        self.assertEqual(res.data["results"], serializer.data)
+
+
+class RecipeFilterTests(TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.tag1 = sample_tag(user=self.user, name="Vegan")
+        self.tag2 = sample_tag(user=self.user, name="Quick")
+        self.ingredient = sample_ingredient(user=self.user, name="Tofu")
+
+    def _titles(self, params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def test_filter_any_returns_no_duplicates(self):
+        """Test that a recipe matching several tags is returned once"""
+        recipe = sample_recipe(user=self.user, title="Both")
+        recipe.tags.add(self.tag1, self.tag2)
+        recipe.ingredients.add(self.ingredient)
+
+        titles = self._titles({
+            "tags": f"{self.tag1.id},{self.tag2.id}",
+            "ingredients": f"{self.ingredient.id}",
+        })
+
+        self.assertEqual(titles, ["Both"])
+
+    def test_filter_all_tags(self):
+        """Test that match=all requires every tag"""
+        both = sample_recipe(user=self.user, title="Both")
+        both.tags.add(self.tag1, self.tag2)
+        one = sample_recipe(user=self.user, title="One")
+        one.tags.add(self.tag1)
+
+        titles = self._titles({
+            "tags": f"{self.tag1.id},{self.tag2.id}",
+            "tags_match": "all",
+        })
+
+        self.assertEqual(titles, ["Both"])
+
+    def test_filter_combines_dimensions(self):
+        """Test that tag and ingredient filters must both match"""
+        tagged = sample_recipe(user=self.user, title="Tagged")
+        tagged.tags.add(self.tag1)
+        full = sample_recipe(user=self.user, title="Full")
+        full.tags.add(self.tag1)
+        full.ingredients.add(self.ingredient)
+
+        titles = self._titles({
+            "tags": f"{self.tag1.id}",
+            "ingredients": f"{self.ingredient.id}",
+            "ingredients_match": "all",
+        })
+
+        self.assertEqual(titles, ["Full"])
+
+    def test_filter_invalid_ids(self):
+        """Test that malformed ids are rejected with a 400"""
+        res = self.client.get(RECIPE_URL, {"tags": "1,abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data)
+
+    def test_filter_invalid_match(self):
+        """Test that an unknown match mode is rejected with a 400"""
+        res = self.client.get(
+            RECIPE_URL,
+            {"ingredients": "1", "ingredients_match": "some"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ingredients_match", res.data)
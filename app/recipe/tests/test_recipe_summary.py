@@ -0,0 +1,145 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.helpers import create_user, sample_recipe
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_BULK_URL = reverse("recipe:tag-bulk")
+
+
+def summary_of(recipe):
+    recipe.refresh_from_db(fields=["summary"])
+    return recipe.summary
+
+
+class RecipeSummaryTests(TestCase):
+    """Test the denormalized summary follows the relations of recipes"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.recipe = sample_recipe(self.user)
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.leek = Ingredient.objects.create(user=self.user, name="Leek")
+
+    def test_new_recipe_summary_is_empty(self):
+        """Test recipes start without tags and ingredients"""
+        self.assertEqual(
+            summary_of(self.recipe), {"tags": [], "ingredients": []}
+        )
+
+    def test_relations_added_and_removed(self):
+        """Test adding and removing relations rewrites the summary"""
+        carrot = Ingredient.objects.create(user=self.user, name="Carrot")
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(carrot, self.leek)
+
+        self.assertEqual(summary_of(self.recipe), {
+            "tags": [{"id": self.tag.id, "name": "Vegan"}],
+            "ingredients": [
+                {"id": self.leek.id, "name": "Leek"},
+                {"id": carrot.id, "name": "Carrot"},
+            ],
+        })
+
+        self.recipe.ingredients.remove(self.leek)
+        self.recipe.tags.clear()
+
+        self.assertEqual(summary_of(self.recipe), {
+            "tags": [],
+            "ingredients": [{"id": carrot.id, "name": "Carrot"}],
+        })
+
+    def test_item_renamed_and_deleted(self):
+        """Test renaming or deleting an item rewrites its recipes"""
+        self.recipe.tags.add(self.tag)
+        self.tag.name = "Plant based"
+        self.tag.save()
+
+        self.assertEqual(
+            summary_of(self.recipe)["tags"],
+            [{"id": self.tag.id, "name": "Plant based"}]
+        )
+
+        self.tag.delete()
+
+        self.assertEqual(summary_of(self.recipe)["tags"], [])
+
+    def test_bulk_rename(self):
+        """Test items renamed by the bulk endpoint rewrite their recipes"""
+        self.recipe.tags.add(self.tag)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        client.patch(
+            TAGS_BULK_URL, [{"id": self.tag.id, "name": "Green"}],
+            format="json"
+        )
+
+        self.assertEqual(summary_of(self.recipe)["tags"][0]["name"], "Green")
+
+
+class RecipeSummaryListTests(TestCase):
+    """Test lists served from the summary match the relation tables"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Leek"),
+            Ingredient.objects.create(user=self.user, name="Carrot")
+        )
+        sample_recipe(self.user, "Bread")
+
+    def test_list_matches_relation_tables(self):
+        """Test the read model returns the same list as the relations"""
+        with override_settings(RECIPE_LIST_READ_MODEL=True):
+            summary = self.client.get(RECIPES_URL).data
+        with override_settings(RECIPE_LIST_READ_MODEL=False):
+            relations = self.client.get(RECIPES_URL).data
+
+        self.assertEqual(summary, relations)
+
+
+class RebuildRecipeSummariesCommandTests(TestCase):
+    """Test the rebuild_recipe_summaries management command"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.recipes = [sample_recipe(self.user, f"Recipe {i}")
+                        for i in range(3)]
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        for recipe in self.recipes:
+            recipe.tags.add(self.tag)
+        # summaries written before the read model existed
+        Recipe.objects.update(summary={"tags": [], "ingredients": []})
+
+    def test_check_reports_stale_summaries(self):
+        """Test --check fails without rewriting stale summaries"""
+        with self.assertRaisesMessage(CommandError, "3 summaries differ"):
+            call_command("rebuild_recipe_summaries", check=True)
+
+        self.assertEqual(summary_of(self.recipes[0])["tags"], [])
+
+    def test_rebuild_in_batches(self):
+        """Test every summary is rebuilt and then verified"""
+        out = StringIO()
+
+        call_command("rebuild_recipe_summaries", batch_size=2, stdout=out)
+
+        self.assertIn("Rebuilt 3 summaries", out.getvalue())
+        self.assertIn("Summaries are consistent", out.getvalue())
+        for recipe in self.recipes:
+            self.assertEqual(
+                summary_of(recipe)["tags"],
+                [{"id": self.tag.id, "name": "Vegan"}]
+            )
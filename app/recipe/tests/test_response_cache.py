@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user, sample_recipe
+from core.models import Tag
+from recipe.cache import ResponseCache, response_cache
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+
+class ResponseCacheApiTests(TestCase):
+    """Test caching of recipe responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test that a repeated list only reads the version stamp"""
+        hits = response_cache.stats()["hits"]
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res.data, first.data)
+        self.assertEqual(response_cache.stats()["hits"], hits + 1)
+
+    def test_detail_served_from_cache(self):
+        """Test that a repeated detail request is a hit"""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        self.client.get(url)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res.data["title"], self.recipe.title)
+
+    def test_cache_keyed_by_query_params(self):
+        """Test that different filters are cached separately"""
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL, {"page_size": 1})
+
+        self.assertEqual(res["X-Cache"], "MISS")
+
+    def test_write_invalidates_cache(self):
+        """Test that a relation change is visible on the next read"""
+        self.client.get(RECIPE_URL)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.recipe.tags.add(tag)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["tags"], [tag.id])
+
+    def test_errors_not_cached(self):
+        """Test that error responses are not stored"""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id + 1000])
+        self.client.get(url)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResponseCacheTests(TestCase):
+    """Test the stampede protection of the response cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.cache = ResponseCache("default", 60, 10, 1)
+
+    def test_waits_for_lock_holder(self):
+        """Test that a caller waits for the value computed by another"""
+        cache.add("key:lock", 1)
+
+        def other_caller_finishes(seconds):
+            cache.set("key", "computed by other")
+
+        with patch("recipe.cache.time.sleep", other_caller_finishes):
+            value, hit = self.cache.get_or_set(
+                "key",
+                lambda: self.fail("value computed twice")
+            )
+
+        self.assertEqual(value, "computed by other")
+        self.assertTrue(hit)
+        self.assertEqual(self.cache.stats()["waits"], 1)
+
+    def test_computes_after_wait_timeout(self):
+        """Test that a caller computes the value if the lock holder hangs"""
+        cache.add("key:lock", 1)
+        self.cache.wait_timeout = 0
+
+        value, hit = self.cache.get_or_set("key", lambda: "computed")
+
+        self.assertEqual(value, "computed")
+        self.assertFalse(hit)
+        self.assertEqual(cache.get("key"), "computed")
+        self.assertEqual(cache.get("key:lock"), 1)
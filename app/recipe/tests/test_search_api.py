@@ -0,0 +1,158 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.helpers import create_user, sample_recipe
+from core.models import Tag, Ingredient
+from recipe.search import trigram_available
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test the ?q= full-text search of the recipe list"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, q, **params):
+        res = self.client.get(RECIPE_URL, {"q": q, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def test_search_title_by_prefix(self):
+        """Test every word of the query prefix-matches the title"""
+        sample_recipe(self.user, "Spaghetti bolognese")
+        sample_recipe(self.user, "Spaghetti carbonara")
+        sample_recipe(self.user, "Tomato soup")
+
+        self.assertEqual(
+            self.search("spag bolo"),
+            ["Spaghetti bolognese"]
+        )
+        self.assertCountEqual(
+            self.search("Spaghetti"),
+            ["Spaghetti bolognese", "Spaghetti carbonara"]
+        )
+
+    def test_search_ingredient_and_tag_names(self):
+        """Test recipes are found by the names of their relations"""
+        soup = sample_recipe(self.user, "Soup")
+        soup.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Leek")
+        )
+        cake = sample_recipe(self.user, "Cake")
+        cake.tags.add(Tag.objects.create(user=self.user, name="Dessert"))
+
+        self.assertEqual(self.search("leek"), ["Soup"])
+        self.assertEqual(self.search("dessert"), ["Cake"])
+
+    def test_title_matches_rank_first(self):
+        """Test title matches rank above ingredient matches"""
+        salad = sample_recipe(self.user, "Salad")
+        salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Chicken")
+        )
+        sample_recipe(self.user, "Roast chicken")
+
+        self.assertEqual(self.search("chicken"), ["Roast chicken", "Salad"])
+
+    def test_search_follows_renames_and_removals(self):
+        """Test the index follows changes to the related names"""
+        recipe = sample_recipe(self.user, "Stew")
+        ingredient = Ingredient.objects.create(user=self.user, name="Beef")
+        recipe.ingredients.add(ingredient)
+
+        ingredient.name = "Lamb"
+        ingredient.save()
+        self.assertEqual(self.search("lamb"), ["Stew"])
+        self.assertEqual(self.search("beef"), [])
+
+        recipe.ingredients.remove(ingredient)
+        self.assertEqual(self.search("lamb"), [])
+
+    def test_unchanged_name_skips_recipes(self):
+        """Test saving an item without renaming it leaves its recipes"""
+        recipe = sample_recipe(self.user, "Stew")
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            tag.save()
+
+        self.assertFalse(any(
+            query["sql"].startswith('UPDATE "core_recipe"')
+            for query in queries
+        ))
+
+    def test_search_combines_with_filters(self):
+        """Test search results are narrowed by the tag filter"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        vegan = sample_recipe(self.user, "Bean chili")
+        vegan.tags.add(tag)
+        sample_recipe(self.user, "Beef chili")
+
+        self.assertEqual(
+            self.search("chili", tags=str(tag.id)),
+            ["Bean chili"]
+        )
+
+    def test_search_only_own_recipes(self):
+        """Test other users' recipes are not searched"""
+        other = create_user(email="other@ryszyydev.com")
+        sample_recipe(other, "Pancakes")
+
+        self.assertEqual(self.search("pancakes"), [])
+
+    def test_search_pages_by_rank(self):
+        """Test cursor pages walk the ranked results once"""
+        for i in range(5):
+            sample_recipe(self.user, "Pie " * (i + 1) + f"number{i}")
+
+        titles = []
+        res = self.client.get(RECIPE_URL, {"q": "pie", "page_size": 2})
+        while True:
+            titles += [recipe["title"] for recipe in res.data["results"]]
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(titles, self.search("pie", page_size=10))
+        self.assertEqual(len(titles), 5)
+
+    def test_search_bulk_created_recipes(self):
+        """Test recipes created in bulk are searchable"""
+        self.client.post(
+            reverse("recipe:recipe-bulk"),
+            [{"title": "Lasagne", "time_minutes": 5, "price": "1.00",
+              "tags": [], "ingredients": []}],
+            format="json"
+        )
+
+        self.assertEqual(self.search("lasagne"), ["Lasagne"])
+
+    def test_search_without_words(self):
+        """Test a query without words matches nothing"""
+        sample_recipe(self.user, "Soup")
+
+        self.assertEqual(self.search("!!"), [])
+
+    def test_search_too_long(self):
+        """Test overly long queries are rejected"""
+        res = self.client.get(RECIPE_URL, {"q": "a" * 201})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_tolerates_typos(self):
+        """Test words similar to the query match where pg_trgm exists"""
+        if not trigram_available():
+            self.skipTest("pg_trgm is not installed")
+        sample_recipe(self.user, "Guacamole")
+
+        self.assertEqual(self.search("guacamoel"), ["Guacamole"])
@@ -0,0 +1,100 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.helpers import create_user, sample_recipe
+from core.models import Tag, Ingredient
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class SparseFieldsApiTests(TestCase):
+    """Test the ?fields= and ?expand= parameters of the recipe API"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user, "Soup")
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.leek = Ingredient.objects.create(user=self.user, name="Leek")
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.leek)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, [query["sql"] for query in queries]
+
+    def test_list_fields(self):
+        """Test only the requested fields and columns are loaded"""
+        res, queries = self.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(
+            res.data["results"], [{"id": self.recipe.id, "title": "Soup"}]
+        )
+        recipe_query = next(sql for sql in queries if "core_recipe" in sql)
+        self.assertNotIn("price", recipe_query)
+        self.assertFalse(any("core_tag" in sql for sql in queries))
+
+    def test_list_expand(self):
+        """Test expanded relations are nested with their names"""
+        res, _ = self.get(
+            RECIPES_URL, {"fields": "id,tags,ingredients", "expand": "tags"}
+        )
+
+        self.assertEqual(res.data["results"], [{
+            "id": self.recipe.id,
+            "tags": [
+                {"id": self.tag.id, "name": "Vegan", "user": self.user.id}
+            ],
+            "ingredients": [self.leek.id],
+        }])
+
+    @override_settings(RECIPE_LIST_READ_MODEL=True)
+    def test_list_expand_from_summary(self):
+        """Test the read model expands relations without joining them"""
+        res, queries = self.get(
+            RECIPES_URL, {"fields": "id,ingredients", "expand": "ingredients"}
+        )
+
+        self.assertEqual(res.data["results"], [{
+            "id": self.recipe.id,
+            "ingredients": [
+                {"id": self.leek.id, "name": "Leek", "user": self.user.id}
+            ],
+        }])
+        self.assertFalse(any("core_ingredient" in sql for sql in queries))
+
+    def test_detail_expand(self):
+        """Test details expand relations unless told otherwise"""
+        res, _ = self.get(detail_url(self.recipe.id), {"fields": "tags"})
+
+        self.assertEqual(res.data, {"tags": [
+            {"id": self.tag.id, "name": "Vegan", "user": self.user.id}
+        ]})
+
+        res, _ = self.get(
+            detail_url(self.recipe.id), {"fields": "tags", "expand": ""}
+        )
+
+        self.assertEqual(res.data, {"tags": [self.tag.id]})
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown field names are a bad request"""
+        res = self.client.get(RECIPES_URL, {"fields": "id,secret"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+
+        res = self.client.get(RECIPES_URL, {"expand": "title"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", res.data)
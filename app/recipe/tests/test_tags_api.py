@@ -1,4 +1,6 @@
+from django.db import connection, IntegrityError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -48,7 +50,7 @@ class PrivateTagTests(TestCase):
         #   test for response
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         #   test if response data is the same as from database call
-        self.assertEqual(res.data, tags_serialized.data)
+        self.assertEqual(res.data["results"], tags_serialized.data)
 
     def test_tags_belong_to_proper_user(self):
         """Test that tag creation happens only for the owner of the tag"""
@@ -67,9 +69,9 @@ class PrivateTagTests(TestCase):
         #   test response code
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         #   test for number of tags for a single user
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
         #   test if response data is the same as data from the database call
-        self.assertEqual(res.data[0]["name"], test_tag.name)
+        self.assertEqual(res.data["results"][0]["name"], test_tag.name)
 
     def test_create_tag_successful(self):
         """Test successful tag creation"""
@@ -121,3 +123,19 @@ class PrivateTagTests(TestCase):
         res = self.client.post(TAGS_URL, {"name": "vege"})
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_tag_does_not_precheck_uniqueness(self):
+        """Test that creating a tag relies on the unique constraint"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(TAGS_URL, {"name": "vege"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(selects, [])
+
+    def test_other_integrity_errors_raised(self):
+        """Test only the unique name constraint is reported as a duplicate"""
+        serializer = TagSerializer()
+
+        with self.assertRaises(IntegrityError):
+            serializer.create({"name": None, "user": self.user})
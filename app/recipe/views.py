@@ -1,33 +1,131 @@
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import autocomplete, export, images, serializers
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedResponseMixin
+from recipe.conditional import ConditionalGetMixin
+from recipe.filters import RecipeFilter
+from recipe.importer import READERS, RecipeImporter, decode_lines
+from recipe.media import serve_file
+from recipe.pagination import RecipePagination, RecipeAttrPagination
+from recipe.search import RecipeSearch
+from recipe.sparse import SparseFieldsMixin
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ConditionalGetMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrPagination
+    # name of the Recipe relation to the items of the viewset
+    recipe_relation = None
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
+    # throttle tokens taken by the actions, 1 for the others
+    throttle_costs = {"list": 2, "bulk": 10}
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by("name")
+        return self.queryset.filter(user=self.request.user) \
+            .order_by("name", "id")
 
     def perform_create(self, serializer):
         """Create a new item"""
         serializer.save(user=self.request.user)
 
+    def get_bulk_save_kwargs(self):
+        return {"user": self.request.user}
+
+    @action(methods=["GET"], detail=False)
+    def autocomplete(self, request):
+        """Return the items with a name or a word of it starting with prefix
+
+        Answered from the in-memory prefix index of the user's items, or
+        from the database for users with too many items to be indexed.
+        """
+        return self.conditional_response(self.complete_prefix, request)
+
+    def complete_prefix(self, request):
+        prefix = request.query_params.get("prefix", "").strip()
+        limit = self.get_autocomplete_limit(request)
+        versions, _ = self.get_version_stamp()
+        model = self.queryset.model
+        index = autocomplete.indexes.get(
+            self.queryset,
+            request.user,
+            dict(versions)[model._meta.model_name]
+        )
+        if index is not None:
+            items = index.search(prefix, limit)
+        else:
+            items = autocomplete.search_queryset(
+                self.get_queryset(), prefix, limit
+            )
+        return Response([{"id": pk, "name": name} for pk, name in items])
+
+    def get_autocomplete_limit(self, request):
+        """Return the number of suggestions requested within limits"""
+        try:
+            limit = int(request.query_params["limit"])
+        except (KeyError, ValueError):
+            return self.autocomplete_limit
+        if limit <= 0:
+            return self.autocomplete_limit
+        return min(limit, self.autocomplete_max_limit)
+
+    def bulk_written(self, instances, created):
+        if not created:
+            # renamed items change the search index of their recipes
+            Recipe.objects.filter(**{
+                f"{self.recipe_relation}__in": instances
+            }).update_related()
+
+    def validate_bulk(self, entries, instances=None):
+        """Reject names repeated in the batch or taken by other items"""
+        names = {data["name"] for data in entries.values() if "name" in data}
+        taken = self.get_queryset().filter(name__in=names)
+        if instances:
+            taken = taken.exclude(pk__in=[i.pk for i in instances.values()])
+        taken = set(taken.values_list("name", flat=True))
+
+        errors = {}
+        seen = set()
+        for index, data in entries.items():
+            name = data.get("name")
+            if name is None:
+                continue
+            if name in taken or name in seen:
+                errors[index] = {"name": [_("This name is already used.")]}
+            seen.add(name)
+        return errors
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    version_collections = ("tag",)
+    recipe_relation = "tags"
+    throttle_scope = "tag"
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -35,33 +133,48 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    version_collections = ("ingredient",)
+    recipe_relation = "ingredients"
+    throttle_scope = "ingredient"
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                    CachedResponseMixin,
+                    SparseFieldsMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """Manage ingredients in the database"""
 
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipePagination
+    version_collections = ("ingredient", "recipe", "tag")
+    throttle_scope = "recipe"
+    # throttle tokens taken by the actions, 1 for the others
+    throttle_costs = {
+        "list": 5, "bulk": 10, "upload_image": 5, "export": 50,
+        "import_recipes": 50,
+    }
+    expandable_fields = ("ingredients", "tags")
+    expanded_actions = ("retrieve",)
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user).order_by("id")
+        fields, expand = self.get_sparse_fields()
+        if self.action == "list":
+            params = self.request.query_params
+            queryset = RecipeFilter(params).filter_queryset(queryset)
+            queryset = RecipeSearch(params).filter_queryset(queryset)
+            if self.use_read_model():
+                return queryset.for_summary_list(fields)
+            return queryset.for_list(fields, expand)
+        elif self.action == "retrieve":
+            return queryset.for_detail(fields, expand)
+
+        return queryset
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -69,16 +182,75 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "list" and self.use_read_model():
+            return serializers.RecipeSummarySerializer
 
         return self.serializer_class
 
+    def use_read_model(self):
+        """Return whether lists read relations from the recipe summary"""
+        return getattr(settings, "RECIPE_LIST_READ_MODEL", False)
+
     def perform_create(self, serializer):
         """Create new recipe"""
         serializer.save(user=self.request.user)
 
+    def get_bulk_save_kwargs(self):
+        return {"user": self.request.user}
+
+    def bulk_written(self, instances, created):
+        Recipe.objects.filter(pk__in=[i.pk for i in instances]) \
+            .update_related()
+
+    @action(methods=["GET"], detail=False, renderer_classes=(
+        export.NDJSONRenderer, export.CSVRenderer
+    ))
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON or CSV
+
+        The format is negotiated from the Accept header or ?format=.
+        """
+        return export.export_response(
+            self.get_queryset(),
+            request.accepted_renderer.format
+        )
+
+    @action(methods=["POST"], detail=False, url_path="import")
+    def import_recipes(self, request):
+        """Import recipes from an uploaded NDJSON or CSV file
+
+        Records are committed in chunks and the reported position resumes
+        an interrupted import when sent back as `start`.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": [_("No file was submitted.")]})
+        try:
+            start = int(request.data.get("start", 0))
+        except (TypeError, ValueError):
+            start = -1
+        if start < 0:
+            raise ValidationError(
+                {"start": [_("A valid non-negative integer is required.")]}
+            )
+        file_format = "csv" if upload.name.lower().endswith(".csv") \
+            else "ndjson"
+
+        importer = RecipeImporter(request.user, start=start)
+        try:
+            report = importer.run(READERS[file_format](decode_lines(upload)))
+        except UnicodeDecodeError:
+            raise ValidationError({"file": [
+                _("The file is not UTF-8 encoded. Records before "
+                  "{position} were imported.").format(
+                    position=importer.position
+                )
+            ]})
+        return Response(report)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """Upload an image to a recipe and queue its processing"""
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -86,13 +258,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            for field in images.VARIANT_FIELDS:
+                setattr(recipe, field, None)
+            with transaction.atomic():
+                serializer.save(image_status=Recipe.IMAGE_PENDING)
+                images.schedule(recipe.pk)
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class RecipeMediaView(APIView):
+    """Serve the images of the authenticated user's recipes"""
+    authentication_classes = (CachedTokenAuthentication,
+                              SessionAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, name):
+        """Send a stored image if one of the user's recipes uses it"""
+        owned = Q()
+        for field in Recipe.IMAGE_FIELDS:
+            owned |= Q(**{field: name})
+        if not Recipe.objects.filter(owned, user=request.user).exists():
+            raise Http404
+        try:
+            path = default_storage.path(name)
+        except SuspiciousFileOperation:
+            raise Http404
+        try:
+            return serve_file(request._request, name, path)
+        except FileNotFoundError:
+            raise Http404
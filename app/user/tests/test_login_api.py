@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.authentication import credential_cache
+from core.helpers import create_user
+
+TOKEN_URL = reverse("user:token")
+PAYLOAD = {"email": "test@ryszyydev.com", "password": "test123"}
+SHA1_HASHER = "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"
+
+
+class LoginApiTests(TestCase):
+    """Test the cost controls of the token endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        credential_cache.clear()
+        self.user = create_user(**PAYLOAD)
+        self.client = APIClient()
+        User = get_user_model()
+        patcher = patch.object(
+            User, "check_password", autospec=True,
+            side_effect=User.check_password
+        )
+        self.check_password = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, **payload):
+        return self.client.post(TOKEN_URL, {**PAYLOAD, **payload})
+
+    def test_repeated_login_skips_hasher(self):
+        """Test a verified password is not hashed again"""
+        first = self.login()
+        second = self.login()
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["token"], first.data["token"])
+        self.assertEqual(self.check_password.call_count, 1)
+        self.assertEqual(Token.objects.count(), 1)
+
+    def test_changed_password_is_checked(self):
+        """Test remembered passwords are forgotten once changed"""
+        self.login()
+        self.user.set_password("other123")
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.check_password.call_count, 2)
+
+    def test_existing_token_returned(self):
+        """Test the token endpoint does not create another token"""
+        token = Token.objects.create(user=self.user)
+
+        res = self.login()
+
+        self.assertEqual(res.data["token"], token.key)
+        self.assertEqual(Token.objects.count(), 1)
+
+    def test_hash_upgraded_on_login(self):
+        """Test passwords are rehashed with the preferred hasher"""
+        with override_settings(PASSWORD_HASHERS=[SHA1_HASHER]):
+            self.user.set_password(PAYLOAD["password"])
+            self.user.save()
+
+        self.login()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    @override_settings(LOGIN_FAILURE_LIMIT_PER_EMAIL=3)
+    def test_failures_per_email_limited(self):
+        """Test an email with too many failures is rejected unhashed"""
+        for _ in range(3):
+            self.login(password="wrong")
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", res)
+        self.assertEqual(self.check_password.call_count, 3)
+
+    @override_settings(LOGIN_FAILURE_LIMIT_PER_IP=2)
+    def test_failures_per_address_limited(self):
+        """Test an address failing for several emails is rejected"""
+        self.login(email="one@ryszyydev.com")
+        self.login(email="two@ryszyydev.com")
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_FAILURE_LIMIT_PER_IP=2)
+    def test_forwarded_for_not_trusted(self):
+        """Test rotating X-Forwarded-For does not change the address"""
+        for index, email in enumerate(["one", "two", "three"]):
+            res = self.client.post(
+                TOKEN_URL,
+                {**PAYLOAD, "email": f"{email}@ryszyydev.com"},
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{index}"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_FAILURE_LIMIT_PER_EMAIL=2)
+    def test_success_resets_email_failures(self):
+        """Test a successful login clears the failures of its email"""
+        self.login(password="wrong")
+        self.login()
+        self.login(password="wrong")
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -1,8 +1,14 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from rest_framework import generics, permissions
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import Throttled, ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
 
-
+from core.authentication import CachedTokenAuthentication
+from core.ratelimit import SlidingWindowCounter
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -11,16 +17,63 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
+def login_failure_counters(request, email):
+    """Return the (counter, key) pairs limiting failed logins
+
+    Failures are counted per client address and per email over
+    LOGIN_FAILURE_WINDOW seconds.
+    """
+    window = getattr(settings, "LOGIN_FAILURE_WINDOW", 900)
+    alias = getattr(settings, "LOGIN_FAILURE_CACHE", "default")
+    per_ip = getattr(settings, "LOGIN_FAILURE_LIMIT_PER_IP", 50)
+    per_email = getattr(settings, "LOGIN_FAILURE_LIMIT_PER_EMAIL", 10)
+    return (
+        (SlidingWindowCounter("login-ip", per_ip, window, alias),
+         BaseThrottle().get_ident(request)),
+        (SlidingWindowCounter("login-email", per_email, window, alias),
+         email),
+    )
+
+
 class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for user"""
+    """Create a new auth token for user
+
+    Clients with too many recent failures, by address or by email, are
+    rejected before their password is hashed. The existing token of the
+    user is returned without creating a new one.
+    """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        email = str(request.data.get("email", "")).lower()
+        counters = login_failure_counters(request, email)
+        waits = [counter.retry_after(key) for counter, key in counters]
+        waits = [wait for wait in waits if wait is not None]
+        if waits:
+            raise Throttled(wait=max(waits))
+
+        serializer = self.serializer_class(
+            data=request.data, context={"request": request}
+        )
+        if not serializer.is_valid():
+            for counter, key in counters:
+                counter.add(key)
+            raise ValidationError(serializer.errors)
+        user = serializer.validated_data["user"]
+        email_counter, email_key = counters[1]
+        email_counter.reset(email_key)
+        try:
+            token = user.auth_token
+        except Token.DoesNotExist:
+            token, _ = Token.objects.get_or_create(user=user)
+        return Response({"token": token.key})
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):